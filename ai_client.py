@@ -0,0 +1,106 @@
+# === DeepSeek 客户端 ===
+# 进程内共用一个带连接池的 Session；显式连接/读取超时；连接失败和 429/5xx 自动退避重试；
+# 回复按 token 流式产出，配合 st.write_stream 边生成边显示；可选按 prompt 哈希落盘缓存。
+import hashlib
+import json
+import os
+import threading
+
+import profiling
+
+BASE_URL = os.environ.get("LIFEOS_DEEPSEEK_URL", "https://api.deepseek.com")
+MODEL = "deepseek-chat"
+TIMEOUT = (5, 60)          # (连接, 两次读之间) 秒；流式时读超时按 token 间隔算
+RETRIES = 3
+CACHE_DIR = os.environ.get("LIFEOS_AI_CACHE", ".ai_cache")
+NO_KEY = "⚠️ 请先在上方【驾驶舱】填入 API Key 🔑"
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def session():
+    global _session
+    with _session_lock:
+        if _session is None:  # requests 只在第一次真正调用 AI 时才导入，登录页不为它买单
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+            retry = Retry(total=RETRIES, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                          allowed_methods=frozenset({"POST"}), raise_on_status=False)
+            _session = requests.Session()
+            _session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=retry))
+            _session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=retry))
+        return _session
+
+
+def _cache_path(messages):
+    digest = hashlib.sha256(json.dumps([MODEL, messages], ensure_ascii=False, sort_keys=True).encode()).hexdigest()
+    return os.path.join(CACHE_DIR, f"{digest}.txt")
+
+
+def _read_cache(messages):
+    try:
+        with open(_cache_path(messages), encoding="utf-8") as f: return f.read()
+    except OSError: return None
+
+
+def _write_cache(messages, text):
+    path = _cache_path(messages)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as f: f.write(text)
+    os.replace(path + ".tmp", path)  # 原子替换，并发写同一个 key 也不会读到半截
+
+
+class AIError(Exception):
+    """调用失败：非 200 响应（status 为状态码）或网络 / 解析错误（status 为 None）。"""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+def _stream(messages, key):
+    import requests
+    try:
+        with session().post(f"{BASE_URL}/chat/completions", headers={"Authorization": f"Bearer {key}"},
+                            json={"model": MODEL, "messages": messages, "stream": True}, timeout=TIMEOUT, stream=True) as res:
+            if res.status_code != 200: raise AIError(res.text, res.status_code)
+            res.encoding = "utf-8"
+            for line in res.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"): continue
+                data = line[5:].strip()
+                if data == "[DONE]": continue  # 读到流结束，连接才能还回连接池
+                delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                if delta: yield delta
+    except (requests.RequestException, ValueError, KeyError) as e:
+        raise AIError(str(e)) from e
+
+
+@profiling.timed_stream("ai")
+def stream_chat(messages, key, cache=False, errors=None):
+    """逐段产出回复文本；出错时产出一段错误提示而不是抛异常，和界面上的直接展示保持一致。
+    给了 errors 列表就把错误（AIError）放进去：调用方据此判断显示出来的是不是模型的回复，别把提示文字当回复存下来。"""
+    if not key:
+        if errors is not None: errors.append(AIError(NO_KEY))
+        yield NO_KEY; return
+    if cache and (hit := _read_cache(messages)) is not None:
+        yield hit; return
+    chunks = []
+    try:
+        for delta in _stream(messages, key):
+            chunks.append(delta); yield delta
+    except AIError as e:
+        if errors is not None: errors.append(e)
+        yield f"API报错: {e}" if e.status else f"\n\n⚠️ {e}"; return
+    if cache and chunks: _write_cache(messages, "".join(chunks))
+
+
+@profiling.timed("ai", "chat")
+def chat(messages, key, cache=False):
+    """一次拿到完整回复（后台任务用）；没 key 或调用失败时抛 AIError，不把错误提示当成回复。"""
+    if not key: raise AIError(NO_KEY)
+    if cache and (hit := _read_cache(messages)) is not None: return hit
+    text = "".join(_stream(messages, key))
+    if cache and text: _write_cache(messages, text)
+    return text
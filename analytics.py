@@ -0,0 +1,303 @@
+# === 分析库：历史明细按 用户 / 月 分区导出成 Parquet，长周期趋势只扫新分区 ===
+# 目录布局（hive 风格，可以直接交给 pyarrow.dataset / DuckDB / pandas 读）:
+#   analytics/task_log/user=<用户>/month=2026-01/part-<lo>-<hi>.parquet
+# task_log / expense_log 按自增 id 的高水位增量导出：每次只导 (hwm, hi]，每个分区最多新增一个文件；
+# PostgreSQL 多副本写入时 id 在插入时分配、提交却有先后，读 MAX(id) 那一刻小一点的 id 可能还没提交：
+# 所以把 hwm 之下最近 GAP_WINDOW 个 id 里缺的号记下来，之后每轮补查一次，超过 GAP_TTL 还没出现就当作回滚掉的号。
+# daily_log 没有 id 且按天 upsert，所以每次把高水位所在月及之后的分区整体重写。
+# 趋势视图先按分区文件算小的部分聚合（按 路径 + mtime 记忆），再合并：新导出的分区才需要读盘。
+# 每轮导出给分区添一个小文件，分区里超过 COMPACT_FILES 个就合并成一个；导出全程持有目录下的文件锁，
+# 同一个 analytics 目录被多个进程共用时只会有一个在导出（LIFEOS_ANALYTICS_SYNC=0 可关掉页面触发的同步，改由定时任务跑 CLI）。
+# pandas / pyarrow 只在真正用到时才导入，不拖慢登录页。
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from urllib.parse import quote
+
+import db
+
+try: import fcntl
+except ImportError: fcntl = None   # Windows：没有 flock，只剩进程内的锁，多进程共用目录时请关掉页面同步
+
+DATA_DIR = os.environ.get("LIFEOS_ANALYTICS_DIR", "analytics")
+SYNC_INTERVAL = 60          # 页面触发的增量导出，每个进程最多这么多秒一次
+SYNC_ENABLED = os.environ.get("LIFEOS_ANALYTICS_SYNC", "1") != "0"
+COMPACT_FILES = 8           # 一个分区里超过这么多个文件就合并成一个
+FETCH_ROWS = 50_000
+GAP_WINDOW = 10_000         # 只在高水位以下这么多个 id 里找缺号：未提交的事务只可能占着最近分配的 id
+GAP_TTL = 3600              # 缺号等这么多秒还没提交，就认为是回滚 / 删除留下的空号，不再补查
+SNAP_COLS = ["snap_emotion", "snap_cognition", "snap_awareness", "snap_motivation", "snap_social"]
+SNAP_LABELS = ["情绪", "认知", "觉察", "动机", "人际"]
+
+# 表 -> (列及 Arrow 类型, 分区时间列)；按 (user_id, 时间列) 排序读，正好走 v2 建的复合索引，分区天然连续
+TABLES = {
+    "task_log": ([("id", "int64"), ("start_time", "string"), ("end_time", "string"), ("theme", "string"), ("task_name", "string"),
+                  ("duration_min", "int64"), ("ipo_stage", "string"), *((c, "float64") for c in SNAP_COLS), ("user_id", "string")], "start_time"),
+    "expense_log": ([("id", "int64"), ("date", "string"), ("item_name", "string"), ("cost", "int64"), ("user_id", "string")], "date"),
+    "daily_log": ([("date", "string"), ("emotion", "float64"), ("cognition", "float64"), ("awareness", "float64"),
+                   ("motivation", "float64"), ("interpersonal", "float64"), ("user_id", "string")], "date"),
+}
+
+_sync_lock = threading.Lock()
+_last_sync = 0.0
+
+
+# --- 导出 ---
+def _manifest_path(out_dir): return os.path.join(out_dir, "_manifest.json")
+
+
+def _load_manifest(out_dir):
+    try:
+        with open(_manifest_path(out_dir), encoding="utf-8") as f: return json.load(f)
+    except (OSError, ValueError): return {}
+
+
+def _save_manifest(out_dir, manifest):
+    path = _manifest_path(out_dir)
+    with open(path + ".tmp", "w", encoding="utf-8") as f: json.dump(manifest, f, indent=1)
+    os.replace(path + ".tmp", path)
+
+
+def _partition_dir(out_dir, table, user, month):
+    return os.path.join(out_dir, table, f"user={quote(str(user), safe='')}", f"month={month}")
+
+
+@contextmanager
+def _export_lock(out_dir, blocking):
+    """进程间互斥（flock）：拿不到且不等待时产出 False。"""
+    if fcntl is None:
+        yield True; return
+    with open(os.path.join(out_dir, "_export.lock"), "a") as f:
+        try: fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False; return
+        try: yield True
+        finally: fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _finish_compaction(out_dir, manifest):
+    """合并新文件已经就位的，删掉它的源文件；新文件没落盘（中途崩了）的，源文件原样保留。"""
+    for job in manifest.pop("compacting", []):
+        if not os.path.exists(job["target"]): continue
+        for path in job["sources"]:
+            try: os.remove(path)
+            except FileNotFoundError: pass
+    _save_manifest(out_dir, manifest)
+
+
+def _compact(out_dir, manifest, partition):
+    """分区里文件太多时合并成一个。先把「新文件 + 要删的源文件」记进 manifest 再替换，删到一半崩了下次接着删，不会重复计数。"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    sources = sorted(e.path for e in os.scandir(partition) if e.name.endswith(".parquet"))
+    if len(sources) <= COMPACT_FILES: return False
+    target = os.path.join(partition, f"compact-{time.time_ns()}.parquet")
+    pq.write_table(pa.concat_tables([pq.read_table(path) for path in sources]), target + ".tmp")
+    manifest.setdefault("compacting", []).append({"target": target, "sources": sources})
+    _save_manifest(out_dir, manifest)
+    os.replace(target + ".tmp", target)
+    _finish_compaction(out_dir, manifest)
+    return True
+
+
+def _write_partitions(cursor, out_dir, table, filename, missing=None, touched=None):
+    """cursor 按 (user_id, 时间) 有序；在 (用户, 月) 变化处切文件。返回 (行数, 文件数)；
+    读到的 id 从 missing 集合里划掉，写过的分区目录放进 touched。"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    cols, ts = TABLES[table]
+    schema = pa.schema([(name, getattr(pa, typ)()) for name, typ in cols])
+    names = [c for c, _ in cols]
+    ts_i, user_i, id_i = names.index(ts), names.index("user_id"), names.index("id") if missing is not None else None
+    rows_out = files = 0
+    buf, key = [], None
+
+    def flush():
+        nonlocal files
+        if not buf: return
+        path = os.path.join(_partition_dir(out_dir, table, *key), filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        columns = list(zip(*buf))
+        pq.write_table(pa.Table.from_arrays([pa.array(columns[i], type=schema.field(i).type) for i in range(len(cols))], schema=schema), path + ".tmp")
+        os.replace(path + ".tmp", path)  # 同名重写是幂等的：中断后重跑同一区间不会产生重复行
+        if touched is not None: touched.add(os.path.dirname(path))
+        files += 1
+
+    while batch := cursor.fetchmany(FETCH_ROWS):
+        for row in batch:
+            if missing: missing.discard(row[id_i])
+            k = (row[user_i], (row[ts_i] or "")[:7])
+            if k != key:
+                flush(); buf.clear(); key = k
+            buf.append(row)
+        rows_out += len(batch)
+    flush()
+    return rows_out, files
+
+
+def export(conn, out_dir=None, wait=True):
+    """把三张表的新数据增量导出到 out_dir，返回 {表: (行数, 文件数)}；别的进程正在导出且 wait=False 时返回 None。"""
+    out_dir = out_dir or DATA_DIR
+    os.makedirs(out_dir, exist_ok=True)
+    with _export_lock(out_dir, wait) as locked:
+        return _export(conn, out_dir) if locked else None
+
+
+def _export(conn, out_dir):
+    manifest = _load_manifest(out_dir)  # 拿到锁之后再读：别的进程刚推进过的高水位要看得到
+    if manifest.get("compacting"): _finish_compaction(out_dir, manifest)
+    result, touched = {}, set()
+    for table in ("task_log", "expense_log"):
+        cols, ts = TABLES[table]
+        state = manifest.setdefault(table, {"hwm": 0})
+        gaps = {gid: since for gid, since in state.get("gaps", []) if since > time.time() - GAP_TTL}
+        # 先把本轮上界记下来：中途失败时下次沿用同一个上界，重写出同名文件而不是多出一份
+        hi = state.get("pending") or conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+        if hi <= state["hwm"] and not gaps:
+            result[table] = (0, 0); continue
+        hi = max(hi, state["hwm"])
+        state["pending"] = hi; _save_manifest(out_dir, manifest)
+        late = sorted(gaps)  # 上几轮的缺号：这一轮要是已经提交了，就跟新数据一起导出
+        where = "id > ? AND id <= ?" + (f" OR id IN ({', '.join('?' * len(late))})" if late else "")
+        # 缺号必须用同一次读到的 id 算：另开一次查询的话，中间刚提交的行会既不算缺号、也没被导出
+        missing = set(late) | set(range(max(state["hwm"], hi - GAP_WINDOW) + 1, hi + 1))
+        cur = db.stream(conn, f"SELECT {', '.join(c for c, _ in cols)} FROM {table} WHERE {where} ORDER BY user_id, {ts}", (state["hwm"], hi, *late))
+        # 只补缺号、没有新 id 的轮次上界不变，用计数区分文件名，免得覆盖上一轮补到的行
+        label = f"{state['hwm'] + 1:012d}-{hi:012d}" if hi > state["hwm"] else f"{hi:012d}-late{state.get('late', 0)}"
+        result[table] = _write_partitions(cur, out_dir, table, f"part-{label}.parquet", missing, touched)
+        cur.close()
+        now = time.time()
+        state["gaps"] = [[gid, gaps.get(gid, now)] for gid in sorted(missing)]
+        if hi == state["hwm"]: state["late"] = state.get("late", 0) + 1
+        state["hwm"] = hi; del state["pending"]; _save_manifest(out_dir, manifest)
+
+    cols, ts = TABLES["daily_log"]
+    state = manifest.setdefault("daily_log", {"month": ""})
+    cur = db.stream(conn, f"SELECT {', '.join(c for c, _ in cols)} FROM daily_log WHERE date >= ? ORDER BY user_id, date", (state["month"],))
+    result["daily_log"] = _write_partitions(cur, out_dir, "daily_log", "part-0.parquet")
+    cur.close()
+    state["month"] = conn.execute("SELECT COALESCE(MAX(substr(date, 1, 7)), '') FROM daily_log").fetchone()[0]
+    _save_manifest(out_dir, manifest)
+    for partition in sorted(touched): _compact(out_dir, manifest, partition)
+    return result
+
+
+def sync(max_age=SYNC_INTERVAL, wait=False):
+    """页面用：距上次导出超过 max_age 秒就在后台线程跑一次增量导出（首次全量可能要几十秒，不能卡住页面）。
+    同一时刻每个进程只有一个导出在跑；返回这次是否真的启动了导出。"""
+    global _last_sync
+    if not SYNC_ENABLED or time.monotonic() - _last_sync < max_age or not _sync_lock.acquire(blocking=False): return False
+
+    def run():
+        global _last_sync
+        conn = db.connect()  # 独立连接：长时间的全量导出不占连接池
+        try: export(conn, wait=False)  # 别的进程正在导出就跳过这一轮
+        finally:
+            conn.close(); _last_sync = time.monotonic(); _sync_lock.release()
+
+    t = threading.Thread(target=run, name="lifeos-analytics", daemon=True)
+    t.start()
+    if wait: t.join()
+    return True
+
+
+def syncing():
+    return _sync_lock.locked()
+
+
+# --- 趋势视图 ---
+def _parts(user_id, table="task_log", out_dir=None):
+    """某用户在 table 下所有分区文件的 (路径, mtime)，作为缓存 key：文件新增或被重写，key 就变。"""
+    base = os.path.join(out_dir or DATA_DIR, table, f"user={quote(str(user_id), safe='')}")
+    out = []
+    try: months = sorted(e.path for e in os.scandir(base) if e.is_dir())
+    except FileNotFoundError: return ()
+    for m in months:
+        out += sorted((e.path, e.stat().st_mtime_ns) for e in os.scandir(m) if e.name.endswith(".parquet"))
+    return tuple(out)
+
+
+@lru_cache(maxsize=16384)
+def _partial(path, mtime_ns):
+    """单个分区文件的部分聚合：逐日×主题分钟数、逐月×阶段分钟数、各 snap 列与时长的充分统计量。"""
+    import numpy as np
+    import pyarrow.parquet as pq
+    df = pq.read_table(path, columns=["start_time", "theme", "duration_min", "ipo_stage", *SNAP_COLS]).to_pandas()
+    day = df["start_time"].str.slice(0, 10)
+    daily = df.groupby([day, df["theme"]])["duration_min"].sum()
+    stage = df.groupby([day.str.slice(0, 7), df["ipo_stage"]])["duration_min"].sum()
+    y = df["duration_min"].to_numpy(dtype=float)
+    x = df[SNAP_COLS].to_numpy(dtype=float)
+    ok = ~np.isnan(x)
+    x0, y0 = np.where(ok, x, 0.0), np.where(ok, y[:, None], 0.0)
+    # [n, Σx, Σy, Σx², Σy², Σxy] × 5 列：合并分区时直接相加
+    stats = np.stack([ok.sum(0), x0.sum(0), y0.sum(0), (x0 * x0).sum(0), (y0 * y0).sum(0), (x0 * y0).sum(0)], axis=1)
+    return daily, stage, stats
+
+
+@lru_cache(maxsize=256)
+def _combined(parts):
+    import numpy as np
+    import pandas as pd
+    partials = [_partial(path, mtime) for path, mtime in parts]
+    daily = pd.concat([p[0] for p in partials]).groupby(level=[0, 1]).sum()
+    stage = pd.concat([p[1] for p in partials]).groupby(level=[0, 1]).sum()
+    return daily, stage, np.sum([p[2] for p in partials], axis=0)
+
+
+def _views(user_id, out_dir=None):
+    for attempt in range(2):
+        parts = _parts(user_id, out_dir=out_dir)
+        if not parts: return None
+        try: return _combined(parts)
+        except FileNotFoundError:  # 列目录和读文件之间分区刚被合并：重新列一次
+            if attempt: raise
+
+
+def rolling_focus(user_id, window=7, out_dir=None):
+    """逐日各主题专注分钟数的 window 天滚动和（行: 日期，列: 主题），没有数据返回空 DataFrame。"""
+    import pandas as pd
+    views = _views(user_id, out_dir)
+    if views is None: return pd.DataFrame()
+    table = views[0].unstack(fill_value=0)
+    table.index = pd.to_datetime(table.index)
+    table = table.reindex(pd.date_range(table.index.min(), table.index.max(), freq="D"), fill_value=0)
+    return table.rolling(window, min_periods=1).sum()
+
+
+def ipo_mix(user_id, out_dir=None):
+    """每月 Input / Process / Output 的时长占比（行: 月份，列: 阶段，每行和为 1）。"""
+    import pandas as pd
+    views = _views(user_id, out_dir)
+    if views is None: return pd.DataFrame()
+    table = views[1].unstack(fill_value=0)
+    return table.div(table.sum(axis=1).replace(0, 1), axis=0)
+
+
+def snap_correlation(user_id, out_dir=None):
+    """各项状态快照分数与任务时长的皮尔逊相关系数（pd.Series，索引为中文维度名）。"""
+    import numpy as np
+    import pandas as pd
+    views = _views(user_id, out_dir)
+    if views is None: return pd.Series(dtype=float)
+    n, sx, sy, sxx, syy, sxy = views[2].T
+    with np.errstate(invalid="ignore", divide="ignore"):
+        r = (n * sxy - sx * sy) / np.sqrt((n * sxx - sx ** 2) * (n * syy - sy ** 2))
+    return pd.Series(r, index=SNAP_LABELS)
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="把 LifeOS 历史数据增量导出为 Parquet")
+    ap.add_argument("command", choices=["export"])
+    ap.add_argument("--db", default=db.DB_URL or db.DB_PATH, help="SQLite 文件路径或 postgresql:// URL")
+    ap.add_argument("--out", default=DATA_DIR)
+    a = ap.parse_args()
+    conn = db.connect(a.db)
+    db.migrate(conn)
+    t0 = time.perf_counter()
+    for table, (rows, files) in export(conn, a.out).items(): print(f"{table}: {rows} 行 → {files} 个分区文件")
+    print(f"✅ 用时 {time.perf_counter() - t0:.1f}s，输出目录 {a.out}")
@@ -1,16 +1,20 @@
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.font_manager as fm # 引入字体管理
-import numpy as np
-import sqlite3
-import requests
 import time
-import hashlib
-import os
-import base64
+import html
+import uuid
 from datetime import datetime, timedelta
 
+import ai_client
+import analytics
+import assets
+import auth
+import cache
+import chat_store
+import db
+import ingest
+import profiling
+import radar
+
 # === 1. 🎄 基础配置 & 纪念日 ===
 LAUNCH_DATE = datetime(2025, 12, 25).date()
 TODAY = datetime.now().date()
@@ -24,112 +28,22 @@ st.set_page_config(
     initial_sidebar_state="collapsed" 
 )
 
-# 🛠️ 字体修复核心逻辑：优先找本地 font.ttf，找不到找系统盘，再不行回退英文
-def get_font_prop():
-    # 1. 优先检查目录下有没有 font.ttf (用户自己上传的)
-    if os.path.exists("font.ttf"):
-        return fm.FontProperties(fname="font.ttf")
-    
-    # 2. 检查常见的系统中文字体路径 (针对 Linux/Windows)
-    common_fonts = [
-        "/usr/share/fonts/truetype/droid/DroidSansFallbackFull.ttf", # Linux 常见
-        "C:\\Windows\\Fonts\\simhei.ttf", # Windows 黑体
-        "C:\\Windows\\Fonts\\msyh.ttf",   # Windows 微软雅黑
-        "/System/Library/Fonts/PingFang.ttc" # Mac
-    ]
-    for f in common_fonts:
-        if os.path.exists(f):
-            return fm.FontProperties(fname=f)
-            
-    # 3. 实在没有，就返回默认（可能会乱码，但至少不报错）
-    return None 
-
-# 获取字体属性对象
-font_prop = get_font_prop()
-
 # ❄️ 氛围：下雪
 st.snow() 
 
 # ==========================================
 # 🎨 样式：零依赖安全版 (纯CSS实现，拒绝网络裂图)
 # ==========================================
-logo_html = ""
-if os.path.exists("logo_day1.png"):
-    try:
-        with open("logo_day1.png", "rb") as f:
-            logo_b64 = base64.b64encode(f.read()).decode()
-        logo_html = f'<img src="data:image/png;base64,{logo_b64}">'
-    except: pass
+ASSETS = assets.build()  # 每个进程预处理一次，页面里只放 URL
+logo_html = assets.picture_html(ASSETS["logo"], "png", style="width:100%; height:100%; object-fit:cover;", sizes="80px") if ASSETS["logo"] else ""
 
 if not logo_html:
     logo_html = """<div style="width:100%; height:100%; display:flex; align-items:center; justify-content:center; background:white; border-radius:50%; font-size:40px;">🎁</div>"""
 
+# 样式表走静态文件：每次 rerun 只发一个 <link>，而不是整段 CSS
+style_html = f'<link rel="stylesheet" href="{ASSETS["css"]}">' if ASSETS["css"] else f"<style>{assets.inline_css()}</style>"
 st.markdown(f"""
-    <style>
-        #MainMenu {{visibility: hidden;}} footer {{visibility: hidden;}} header {{visibility: hidden;}}
-        .block-container {{padding-top: 1rem;}}
-
-        /* 🎄 全局红绿边框 */
-        .stApp {{
-            border: 8px solid transparent;
-            border-image: linear-gradient(to bottom right, #d42e2e 0%, #2e8b57 100%);
-            border-image-slice: 1;
-            margin: 5px;
-        }}
-
-        /* 标题样式 */
-        .main-title {{
-            text-align: center; font-family: 'Arial Black', sans-serif; font-size: 2.5em;
-            background: -webkit-linear-gradient(#d63031, #00b894); -webkit-background-clip: text;
-            -webkit-text-fill-color: transparent; margin-top: 10px;
-            text-shadow: 1px 1px 2px rgba(0,0,0,0.1);
-        }}
-
-        /* 右下角固定 Logo */
-        .fixed-logo {{
-            position: fixed; bottom: 20px; right: 20px; z-index: 9999;
-            text-align: center; opacity: 0.9; transition: all 0.3s ease;
-        }}
-        .fixed-logo:hover {{ transform: scale(1.1); opacity: 1; }}
-        .logo-container {{
-            width: 80px; height: 80px; 
-            border-radius: 50%; 
-            border: 3px solid #d63031;
-            box-shadow: 0 0 15px rgba(214, 48, 49, 0.5); 
-            background: white;
-            overflow: hidden; 
-        }}
-        
-        /* 🎁 圣诞版：6大主题卡片 */
-        .christmas-card {{
-            background: white;
-            border: 2px solid #e6e6e6;
-            border-radius: 15px;
-            padding: 15px;
-            margin-bottom: 15px;
-            transition: transform 0.2s;
-            box-shadow: 0 4px 6px rgba(0,0,0,0.05);
-        }}
-        .christmas-card:hover {{
-            transform: translateY(-3px);
-            border-color: #2e8b57;
-            box-shadow: 0 8px 15px rgba(46, 139, 87, 0.15);
-        }}
-        .candy-cane-bar {{ width: 100%; height: 10px; background-color: #f1f1f1; border-radius: 5px; overflow: hidden; margin-top: 8px; }}
-        .candy-cane-fill {{ height: 100%; background: repeating-linear-gradient(45deg, #d63031, #d63031 10px, #ff7675 10px, #ff7675 20px); border-radius: 5px; }}
-
-        /* 商店卡片 */
-        .shop-item {{ background: white; border: 1px solid #eee; border-radius: 12px; padding: 15px; text-align: center; cursor: pointer; transition: 0.2s; }}
-        .shop-item:hover {{ border-color: #d63031; box-shadow: 0 0 15px rgba(214, 48, 49, 0.2); }}
-
-        /* CSS Banner 样式 */
-        .christmas-banner {{
-            background: linear-gradient(135deg, #d42e2e 0%, #2e8b57 100%);
-            padding: 30px; border-radius: 20px; text-align: center; color: white;
-            box-shadow: 0 10px 30px rgba(0,0,0,0.15); margin-bottom: 20px; border: 2px solid #fab1a0;
-        }}
-        .christmas-banner h1 {{ font-family: 'Arial Black', sans-serif; font-size: 2.8em; margin: 0; text-shadow: 2px 2px 4px rgba(0,0,0,0.2); color: #fff; }}
-    </style>
+    {style_html}
     <div class="fixed-logo">
         <div class="logo-container">{logo_html}</div>
         <div style="font-size:10px; color:#d63031; font-weight:bold; background:white; padding:2px; border-radius:4px; margin-top:5px;">Day {DAYS_RUNNING}</div>
@@ -147,83 +61,87 @@ THEME_CONFIG = {
 }
 DEFAULT_GOODS = [{"name": "🥤 快乐水", "price": 60, "icon": "🥤"},{"name": "🎮 游戏时光", "price": 120, "icon": "🎮"},{"name": "🎁 圣诞盲盒", "price": 180, "icon": "🎁"},{"name": "🛌 赖床券", "price": 200, "icon": "🛌"},{"name": "🍰 生日蛋糕", "price": 0, "icon": "🎂"},{"name": "✈️ 旅行基金", "price": 5000, "icon": "✈️"}]
 
-def make_hashes(password): return hashlib.sha256(str.encode(password)).hexdigest()
-def check_hashes(password, hashed_text): return make_hashes(password) == hashed_text
-
-def init_db():
-    conn = sqlite3.connect('life_os.db'); c = conn.cursor()
-    c.execute('CREATE TABLE IF NOT EXISTS users (username TEXT PRIMARY KEY, password TEXT)')
-    c.execute('CREATE TABLE IF NOT EXISTS daily_log (date TEXT, emotion REAL, cognition REAL, awareness REAL, motivation REAL, interpersonal REAL, user_id TEXT)')
-    c.execute('CREATE TABLE IF NOT EXISTS task_log (id INTEGER PRIMARY KEY AUTOINCREMENT, start_time TEXT, end_time TEXT, theme TEXT, task_name TEXT, duration_min INTEGER, ipo_stage TEXT, snap_emotion REAL, snap_cognition REAL, snap_awareness REAL, snap_motivation REAL, snap_social REAL, user_id TEXT)')
-    c.execute('CREATE TABLE IF NOT EXISTS expense_log (id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT, item_name TEXT, cost INTEGER, user_id TEXT)')
-    c.execute('CREATE TABLE IF NOT EXISTS weekly_reports (id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT, start_date TEXT, end_date TEXT, content TEXT, user_id TEXT)')
-    conn.commit(); conn.close()
-
-def add_user(username, password):
-    conn = sqlite3.connect('life_os.db'); c = conn.cursor()
-    try: c.execute('INSERT INTO users VALUES (?,?)', (username, make_hashes(password))); conn.commit(); return True
-    except: return False
-    finally: conn.close()
-
-def login_user(username, password):
-    conn = sqlite3.connect('life_os.db'); c = conn.cursor()
-    c.execute('SELECT password FROM users WHERE username = ?', (username,)); data = c.fetchall(); conn.close()
-    return check_hashes(password, data[0][0]) if data else False
-
 # === 业务逻辑 ===
+# 写操作统一走 ingest 写入队列（group commit，提交后才返回）；读函数按用户缓存，写完只作废受影响的读函数
+# 所有 DB 函数都挂了 profiling.timed：LIFEOS_PROFILE 没开时装饰器原样返回函数，零开销
+@profiling.timed("db")
 def save_status(scores, user_id):
-    conn = sqlite3.connect('life_os.db'); c = conn.cursor()
-    today = datetime.now().strftime("%Y-%m-%d")
-    c.execute("DELETE FROM daily_log WHERE date=? AND user_id=?", (today, user_id))
-    c.execute("INSERT INTO daily_log VALUES (?,?,?,?,?,?,?)", (today, *scores, user_id)); conn.commit(); conn.close()
-    st.toast("✅ 状态已同步！", icon="🎄")
+    ingest.write(db.upsert_status, datetime.now().strftime("%Y-%m-%d"), scores, user_id)
+    st.toast("✅ 状态已同步！", icon="🎄")  # daily_log 目前没有被缓存的读函数，无需作废
 
+@profiling.timed("db")
 def save_task(start, theme, task, duration, ipo, scores, user_id):
-    conn = sqlite3.connect('life_os.db'); conn.execute("INSERT INTO task_log VALUES (NULL,?,?,?,?,?,?,?,?,?,?,?,?)", (start, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), theme, task, duration, ipo, *scores, user_id)); conn.commit(); conn.close()
-
-def buy_item(name, price, user_id):
-    conn = sqlite3.connect('life_os.db'); conn.execute("INSERT INTO expense_log VALUES (NULL,?,?,?,?)", (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), name, price, user_id)); conn.commit(); conn.close()
-
+    ingest.write(db.insert_task, start, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), theme, task, duration, ipo, scores, user_id)
+    cache.invalidate(user_id, get_finance_status, get_theme_stats, get_today_tasks, get_weekly_stats)
+
+@profiling.timed("db")
+def buy_item(name, price, user_id, request_id=None):
+    # 余额校验和扣款在写线程的同一个 BEGIN IMMEDIATE 事务里完成，连点两下或开两个标签页都不会超花
+    result = ingest.write(db.purchase, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), name, price, user_id, request_id)
+    if result == db.PURCHASE_OK: cache.invalidate(user_id, get_finance_status, get_weekly_stats)
+    return result
+
+@cache.memo_by_user
+@profiling.timed("db")  # 缓存未命中时才计：测的是真正落到 SQLite 的耗时
 def get_finance_status(user_id):
-    conn = sqlite3.connect('life_os.db'); c = conn.cursor()
-    c.execute("SELECT SUM(duration_min) FROM task_log WHERE user_id=?", (user_id,)); inc = c.fetchone()[0] or 0
-    c.execute("SELECT SUM(cost) FROM expense_log WHERE user_id=?", (user_id,)); exp = c.fetchone()[0] or 0
-    conn.close(); return inc, exp, inc-exp
+    with db.connection() as conn: row = conn.execute("SELECT income, spend FROM user_summary WHERE user_id=?", (user_id,)).fetchone()
+    inc, exp = row or (0, 0)
+    return inc, exp, inc-exp
 
+@cache.memo_by_user
+@profiling.timed("db")
 def get_theme_stats(user_id):
-    conn = sqlite3.connect('life_os.db'); df = pd.read_sql_query("SELECT theme, SUM(duration_min) as total FROM task_log WHERE user_id=? GROUP BY theme", conn, params=(user_id,)); conn.close(); stats = {}
-    for k in THEME_CONFIG.keys(): row = df[df['theme']==k]; total = row['total'].values[0] if not row.empty else 0; stats[k] = {"lvl": int(total/60), "prog": (total%60)/60*100, "total": total}
+    with db.connection() as conn: totals = dict(conn.execute("SELECT theme, minutes FROM theme_summary WHERE user_id=?", (user_id,)).fetchall())
+    stats = {}
+    for k in THEME_CONFIG.keys(): total = totals.get(k, 0); stats[k] = {"lvl": int(total/60), "prog": (total%60)/60*100, "total": total}
     return stats
 
+@cache.memo_by_user
+@profiling.timed("db")
 def get_today_tasks(user_id):
-    conn = sqlite3.connect('life_os.db'); 
-    try: df = pd.read_sql_query("SELECT * FROM task_log WHERE user_id=? ORDER BY id DESC LIMIT 10", conn, params=(user_id,))
-    except: df = pd.DataFrame()
-    conn.close(); return df
+    with db.connection() as conn: return db.fetch_dicts(conn, "SELECT * FROM task_log WHERE user_id=? ORDER BY id DESC LIMIT 10", (user_id,))
 
+@profiling.timed("db")
 def save_weekly_report(content, user_id):
-    conn = sqlite3.connect('life_os.db'); today = datetime.now().strftime("%Y-%m-%d"); start = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
-    conn.execute("INSERT INTO weekly_reports VALUES (NULL,?,?,?,?,?)", (today, start, today, content, user_id)); conn.commit(); conn.close()
+    today = datetime.now().strftime("%Y-%m-%d"); start = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
+    ingest.write(db.insert_report, today, start, today, content, user_id)
+    cache.invalidate(user_id, get_past_reports)
     st.success("✅ 周报已归档！")
 
+@cache.memo_by_user
+@profiling.timed("db")
 def get_past_reports(user_id):
-    conn = sqlite3.connect('life_os.db')
-    try: df = pd.read_sql_query("SELECT * FROM weekly_reports WHERE user_id=? ORDER BY id DESC", conn, params=(user_id,))
-    except: df = pd.DataFrame()
-    conn.close(); return df
-
-def get_weekly_data(user_id):
-    conn = sqlite3.connect('life_os.db'); end = datetime.now(); start = end - timedelta(days=7)
-    t = pd.read_sql_query(f"SELECT * FROM task_log WHERE user_id='{user_id}' AND start_time > '{start}'", conn)
-    e = pd.read_sql_query(f"SELECT * FROM expense_log WHERE user_id='{user_id}' AND date > '{start}'", conn)
-    conn.close(); return t, e, start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')
-
-def call_deepseek_ai(prompt, key):
-    if not key: return "⚠️ 请先在上方【驾驶舱】填入 API Key 🔑"
-    try:
-        res = requests.post("https://api.deepseek.com/chat/completions", headers={"Authorization": f"Bearer {key}"}, json={"model": "deepseek-chat", "messages": [{"role":"user","content":prompt}], "stream":False})
-        return res.json()['choices'][0]['message']['content'] if res.status_code == 200 else f"API报错: {res.text}"
-    except Exception as e: return str(e)
+    with db.connection() as conn: return db.fetch_dicts(conn, "SELECT * FROM weekly_reports WHERE user_id=? ORDER BY id DESC", (user_id,))
+
+def week_window(weeks_ago=0):
+    """最近 7 个自然日（含今天）往前推 weeks_ago 周的 [start, end)；按天取整，同一天内缓存 key 不变。"""
+    end = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1 - 7 * weeks_ago)
+    return end - timedelta(days=7), end
+
+@cache.memo_by_user
+@profiling.timed("db")
+def get_weekly_stats(user_id, start, end):
+    """[start, end) 内的聚合指标，全部在 SQL 里算完：走 (user_id, start_time) / (user_id, date) 索引，不取明细行。"""
+    lo, hi = start.strftime("%Y-%m-%d %H:%M:%S"), end.strftime("%Y-%m-%d %H:%M:%S")
+    w = {"start": start.strftime("%Y-%m-%d"), "end": (end - timedelta(days=1)).strftime("%Y-%m-%d"), "minutes": 0, "tasks": 0, "spend": 0,
+         "by_theme": {}, "by_stage": {}, "by_item": {}, "daily": {}}
+    with db.connection() as conn:
+        for theme, stage, mins, n in conn.execute("SELECT theme, ipo_stage, SUM(duration_min), COUNT(*) FROM task_log WHERE user_id=? AND start_time>=? AND start_time<? GROUP BY theme, ipo_stage", (user_id, lo, hi)):
+            w["minutes"] += mins; w["tasks"] += n
+            w["by_theme"][theme] = w["by_theme"].get(theme, 0) + mins
+            w["by_stage"][stage] = w["by_stage"].get(stage, 0) + mins
+        for item, cost in conn.execute("SELECT item_name, SUM(cost) FROM expense_log WHERE user_id=? AND date>=? AND date<? GROUP BY item_name", (user_id, lo, hi)):
+            w["spend"] += cost; w["by_item"][item] = cost
+        for day, mins, n in conn.execute("SELECT substr(start_time,1,10) AS day, SUM(duration_min), COUNT(*) FROM task_log WHERE user_id=? AND start_time>=? AND start_time<? GROUP BY day", (user_id, lo, hi)):
+            w["daily"][day] = {"minutes": mins, "tasks": n, "spend": 0}
+        for day, cost in conn.execute("SELECT substr(date,1,10) AS day, SUM(cost) FROM expense_log WHERE user_id=? AND date>=? AND date<? GROUP BY day", (user_id, lo, hi)):
+            w["daily"].setdefault(day, {"minutes": 0, "tasks": 0, "spend": 0})["spend"] = cost
+    w["daily"] = dict(sorted(w["daily"].items()))
+    return w
+
+def get_weekly_series(user_id, weeks=4):
+    """最近 weeks 周各自的聚合（从旧到新），用于多周对比；每周单独缓存。"""
+    return [get_weekly_stats(user_id, *week_window(i)) for i in reversed(range(weeks))]
 
 # === UI 组件 ===
 def render_theme_card_christmas(name, data):
@@ -247,51 +165,210 @@ def render_theme_card_christmas(name, data):
     </div>
     """, unsafe_allow_html=True)
 
-# 🛠️ 雷达图修复版：支持自定义字体，防止乱码
-def plot_radar_v2(scores):
-    # 标签：如果没字体，就用英文防乱码
-    if font_prop:
-        labels = ['情绪', '认知', '觉察', '动机', '人际']
-    else:
-        labels = ['Emotion', 'Cognition', 'Awareness', 'Motivation', 'Social']
-
-    angles = np.linspace(0, 2*np.pi, 5, endpoint=False).tolist()
-    scores_plot = scores + scores[:1]; angles += angles[:1]
-    
-    fig, ax = plt.subplots(figsize=(4, 4), subplot_kw=dict(polar=True))
-    fig.patch.set_alpha(0); ax.set_facecolor('#f8f9fa'); ax.spines['polar'].set_visible(False)
-    
-    # 关键修改：应用字体
-    if font_prop:
-        ax.set_xticklabels(labels, fontsize=10, fontweight='bold', fontproperties=font_prop)
-    else:
-        ax.set_xticklabels(labels, fontsize=10, fontweight='bold')
-
-    ax.set_yticklabels([]); ax.set_xticks(angles[:-1]); 
-    color = '#2e8b57' if sum(scores)/5 >= 6 else '#d63031' 
-    ax.fill(angles, scores_plot, color=color, alpha=0.3); ax.plot(angles, scores_plot, color=color, linewidth=2)
-    return fig
+# ⏱️ 专注计时器：JS 在浏览器端每秒刷新，起点用服务端算好的已过秒数，不受客户端时钟偏差影响
+def render_focus_timer(task, elapsed_sec):
+    st.iframe(f"""
+    <div style='text-align:center; padding:30px; background:#2d3436; color:white; border-radius:15px; border: 2px solid #d63031; font-family:sans-serif;'>
+        <h2>🎄 专注中: {html.escape(task)}</h2>
+        <h1 id='clock' style='font-size:60px; font-family:monospace; color:#55efc4; margin:10px 0;'>--:--</h1>
+        <p>💡 计时在浏览器端运行，请不要刷新页面</p>
+    </div>
+    <script>
+        const base = {elapsed_sec:.3f}, t0 = performance.now();
+        const pad = n => String(n).padStart(2, '0');
+        function tick() {{
+            const s = Math.floor(base + (performance.now() - t0) / 1000);
+            document.getElementById('clock').textContent = pad(Math.floor(s / 60)) + ':' + pad(s % 60);
+        }}
+        tick(); setInterval(tick, 1000);
+    </script>
+    """, height=270)
 
 # 智能Banner (零依赖版)
 def render_banner():
-    has_image = False
-    if os.path.exists("banner.png"):
-        try: st.image("banner.png", use_container_width=True); has_image=True
-        except: pass
-    elif os.path.exists("banner.jpg"):
-        try: st.image("banner.jpg", use_container_width=True); has_image=True
-        except: pass
-    if not has_image:
+    if ASSETS["banner"]:
+        st.markdown(assets.picture_html(ASSETS["banner"], "jpg", alt="LifeOS banner", style="width:100%; border-radius:10px;", sizes="(max-width: 1200px) 100vw, 1200px"), unsafe_allow_html=True)
+    else:
         st.markdown("""<div class="christmas-banner"><h1>🎄 LifeOS Cloud 🎅</h1><p>Merry Christmas & Happy Birthday!</p></div>""", unsafe_allow_html=True)
     st.markdown("<h1 class='main-title'>🎄 LifeOS Cloud</h1>", unsafe_allow_html=True)
 
+# === 6大标签页：每个 Tab 一个渲染函数，只执行当前选中的那个 ===
+def tab_battle(user_id):
+    stats = get_theme_stats(user_id)
+    cols = st.columns(3) + st.columns(3)
+    for i, k in enumerate(THEME_CONFIG):
+        with cols[i]:
+            render_theme_card_christmas(k, stats[k])
+
+    if not st.session_state.timer_active:
+        st.divider()
+        c1, c2, c3 = st.columns([2,1,1])
+        with c1: task = st.text_input("当前任务")
+        with c2: theme = st.selectbox("领域", list(THEME_CONFIG.keys()))
+        with c3: ipo = st.selectbox("阶段", ["Input", "Process", "Output"])
+
+        if st.button("🔥 开始专注", type="primary", use_container_width=True) and task: 
+            st.session_state.timer_active=True
+            st.session_state.start_time=datetime.now()
+            st.session_state.current_theme=theme
+            st.session_state.current_task=task
+            st.session_state.current_ipo=ipo
+            st.rerun()
+    else:
+        diff = datetime.now() - st.session_state.start_time
+        mins = int(diff.total_seconds()/60)
+
+        # 🟢 倒计时在浏览器里走：服务端只在「开始」和「完成」时各跑一次
+        render_focus_timer(st.session_state.current_task, diff.total_seconds())
+
+        if st.button("🏁 完成任务", type="primary", use_container_width=True): 
+            default_scores = [5,5,5,5,5]
+            save_task(st.session_state.start_time.strftime("%Y-%m-%d %H:%M:%S"), st.session_state.current_theme, st.session_state.current_task, mins, st.session_state.current_ipo, default_scores, user_id)
+            st.session_state.timer_active=False
+            st.balloons()
+            st.rerun()
+
+def _shop_click(nonce, i, item, user_id):
+    # 回调在重跑脚本之前执行，参数是渲染货架时绑定的 nonce：连点、或第二下打断了上一次重跑，都还是同一个幂等键
+    st.session_state.shop_result = (i, None)  # 先占位：写入超时也不换 nonce，重试仍按同一个键去重
+    st.session_state.shop_result = (i, buy_item(item['name'], item['price'], user_id, f"{nonce}:{i}"))
+
+def tab_shop(user_id):
+    # 没有点击的渲染、或刚判定为重复之后才换新 nonce；成交后紧跟的那次重跑不带点击，正好换掉
+    clicked, result = st.session_state.pop("shop_result", (None, None))
+    if clicked is None or result == db.PURCHASE_DUPLICATE: st.session_state.shop_nonce = uuid.uuid4().hex
+    nonce = st.session_state.shop_nonce
+    cols = st.columns(4)
+    for i, item in enumerate(DEFAULT_GOODS):
+        with cols[i%4]:
+            st.markdown(f"<div class='shop-item'><h1>{item['icon']}</h1><b>{item['name']}</b><br><span style='color:#d63031; font-weight:bold;'>¥ {item['price']}</span></div>", unsafe_allow_html=True)
+            st.button("🎁 兑换", key=f"b{i}", use_container_width=True, on_click=_shop_click, args=(nonce, i, item, user_id))
+            if clicked != i: continue
+            if result == db.PURCHASE_OK:
+                st.balloons()
+                time.sleep(1)
+                st.rerun()
+            elif result == db.PURCHASE_DUPLICATE: st.info("这笔兑换已经处理过啦")
+            elif result == db.PURCHASE_INSUFFICIENT: st.error("金币不够啦")
+
+def tab_log(user_id):
+    cols = ['end_time','theme','task_name','duration_min','ipo_stage']
+    st.dataframe([{c: t[c] for c in cols} for t in get_today_tasks(user_id)], column_order=cols, hide_index=True, use_container_width=True)
+
+CHAT_PAGE = 20  # 每页消息数：默认只渲染最近一页，往上翻再按页加载
+
+def tab_ai(user_id):
+    pages = st.session_state.setdefault("chat_pages", 1)
+    history, has_more = chat_store.recent(user_id, pages * CHAT_PAGE)
+    box = st.container(height=520)  # 固定高度滚动区，消息再多页面也不会无限拉长
+    with box:
+        if has_more and st.button("⬆️ 加载更早的消息", use_container_width=True):
+            st.session_state.chat_pages += 1
+            st.rerun()
+        for role, content in history: st.chat_message(role).write(content)
+    if prompt := st.chat_input("输入问题..."):
+        chat_store.append(user_id, "user", prompt)
+        with box:
+            st.chat_message("user").write(prompt)
+            with st.chat_message("assistant"):  # 边生成边显示；上下文 = 滚动摘要 + 预算内的最近几轮
+                errors = []
+                reply = st.write_stream(ai_client.stream_chat(chat_store.context(user_id), st.session_state.deepseek_key, errors=errors))
+        if errors: return  # 报错提示只显示、不入库，免得之后当成助手的回复发回给模型
+        chat_store.append(user_id, "assistant", reply)
+        chat_store.compact_async(user_id, st.session_state.deepseek_key)
+
+def tab_weekly(user_id):
+    w = get_weekly_stats(user_id, *week_window())
+    st.info(f"📅 统计范围: {w['start']} 至 {w['end']}")
+    with st.expander("📈 近四周对比"):
+        st.bar_chart({"专注分钟": {f"{s['start'][5:]}~{s['end'][5:]}": s["minutes"] for s in get_weekly_series(user_id)}})
+    streamed = False
+    if st.button("⚡ 生成本周周报"):
+        if not w["tasks"]: st.warning("本周暂无数据")
+        else:
+            prompt = f"我是{user_id}。根据本周数据(专注{w['minutes']}分钟, 消费{w['spend']}, 完成{w['tasks']}任务)，写一份温馨幽默的圣诞生日周报。"
+            # 同样的数据重复生成时直接读磁盘缓存
+            errors = []
+            report = st.write_stream(ai_client.stream_chat([{"role": "user", "content": prompt}], st.session_state.deepseek_key, cache=True, errors=errors))
+            if not errors: st.session_state.current_report, streamed = report, True  # 报错提示不能被「归档保存」
+    if "current_report" in st.session_state:
+        if not streamed: st.write(st.session_state.current_report)
+        if st.button("💾 归档保存"): 
+            save_weekly_report(st.session_state.current_report, user_id)
+            del st.session_state.current_report
+            st.rerun()
+    st.markdown("---")
+    st.subheader("🗄️ 往期周报档案")
+    reports = get_past_reports(user_id)
+    if not reports: st.caption("暂无历史存档")
+    else:
+        for row in reports: 
+            with st.expander(f"📅 {row['date']} (存档 #{row['id']})"): 
+                st.write(row['content'])
+
+def tab_status(user_id):
+    st.subheader("📊 核心状态调控中心")
+    c1, c2 = st.columns([1, 1])
+    with c1:
+        st.write("请为当下的状态打分 (0-10):")
+        scores = [st.slider(l,0,10,5, key=f"s_{i}") for i, l in enumerate(["情绪","认知","觉察","动机","人际"])]
+        st.write("")
+        if st.button("📡 同步状态数据", type="primary", use_container_width=True):
+            save_status(scores, user_id)
+    with c2:
+        st.write("当前五维能力雷达图:")
+        # 🛡️ SVG 由浏览器排版中文，不再需要 font.ttf
+        st.markdown(radar.radar_svg(tuple(scores)), unsafe_allow_html=True)
+
+def tab_trends(user_id):
+    st.subheader("📈 长期趋势")
+    # 全部历史走 Parquet 分析库：后台增量导出，这里只读分区文件上记忆好的部分聚合
+    analytics.sync()
+    focus = analytics.rolling_focus(user_id)
+    if focus.empty:
+        st.info("⏳ 分析库正在后台生成，稍后再来看看" if analytics.syncing() else "还没有足够的历史记录")
+        return
+    st.caption("⏳ 正在同步最新记录…" if analytics.syncing() else f"数据每 {analytics.SYNC_INTERVAL} 秒同步一次")
+    st.write("**近 7 天滚动专注分钟（按主题）**")
+    st.line_chart(focus.tail(180))
+    c1, c2 = st.columns(2)
+    with c1:
+        st.write("**每月 IPO 阶段占比**")
+        st.bar_chart(analytics.ipo_mix(user_id).tail(12))
+    with c2:
+        st.write("**状态快照 × 任务时长 相关系数**")
+        st.bar_chart(analytics.snap_correlation(user_id))
+
+TABS = {"⚔️ 作战中心": tab_battle, "🎁 商店": tab_shop, "📜 日志": tab_log, "🤖 AI": tab_ai, "📝 周报": tab_weekly, "📊 状态调控": tab_status, "📈 趋势": tab_trends}
+
+profiling.register_gauges("cache", cache.stats, counters=("hits", "misses", "evictions", "expirations", "invalidations"))
+
+def render_admin_panel():
+    # 隐藏的性能面板：只在 LIFEOS_PROFILE 打开且当前账号在 LIFEOS_ADMINS 里时出现
+    with st.expander("🛠️ 性能面板 (profiling)", expanded=False):
+        rows = profiling.snapshot()
+        if rows: st.dataframe(rows, use_container_width=True, hide_index=True, column_order=["kind", "name", "count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "total_s", "sql"])
+        else: st.caption("还没有采样数据")
+        cs = cache.stats()  # 进程级读缓存（所有用户合计），只给管理员看
+        st.caption(f"⚡ Cache: {cs['hit_rate']:.0%} hit · {cs['hits']} hits / {cs['misses']} misses · {cs['entries']} entries · {cs['bytes'] // 1024} / {cs['max_bytes'] // 1024} KB · {cs['evictions']} evictions")
+        st.caption(f"Prometheus: http://{profiling.METRICS_HOST}:{profiling.METRICS_PORT}/metrics" if profiling.METRICS_PORT else "设置 LIFEOS_METRICS_PORT 可开启 /metrics 导出")
+        c1, c2 = st.columns(2)
+        c1.download_button("⬇️ 导出 Prometheus 文本", profiling.prometheus_text(), file_name="lifeos_metrics.txt", use_container_width=True)
+        if c2.button("♻️ 清空统计", use_container_width=True): profiling.reset(); st.rerun()
+
 # === 5. 主程序 ===
+@profiling.timed("rerun", "main")
 def main():
-    init_db()
+    profiling.serve()  # 开了 LIFEOS_METRICS_PORT 才会起 /metrics，每个进程一次
+    db.get_pool()  # 建表 + 连接池：每个进程只初始化一次
     
-    if "user" in st.query_params: 
-        st.session_state.logged_in = True
-        st.session_state.username = st.query_params["user"]
+    # URL 里只放签名令牌：刷新页面时内存校验即可恢复登录，伪造用户名进不来
+    if not st.session_state.get("logged_in") and "t" in st.query_params:
+        token_user = auth.verify_token(st.query_params["t"])
+        if token_user:
+            st.session_state.logged_in = True
+            st.session_state.username = token_user
+        else: del st.query_params["t"]
     if 'logged_in' not in st.session_state: st.session_state.logged_in = False
     if 'username' not in st.session_state: st.session_state.username = ""
     if 'timer_active' not in st.session_state: st.session_state.timer_active = False
@@ -308,17 +385,17 @@ def main():
                 username = st.text_input("用户名", key="login_user")
                 password = st.text_input("密码", type="password", key="login_pass")
                 if st.button("🚀 进入系统", use_container_width=True):
-                    if login_user(username, password):
+                    if auth.login(username, password):
                         st.session_state.logged_in = True
                         st.session_state.username = username
-                        st.query_params["user"] = username
+                        st.query_params["t"] = auth.issue_token(username)
                         st.rerun()
                     else: st.error("账号或密码错啦")
             with tab_reg:
                 new_user = st.text_input("新用户名", key="reg_user")
                 new_pass = st.text_input("设置密码", type="password", key="reg_pass")
                 if st.button("✨ 创建账号", use_container_width=True):
-                    if add_user(new_user, new_pass): st.success("注册成功！请登录")
+                    if auth.register(new_user, new_pass): st.success("注册成功！请登录")
                     else: st.error("用户名已存在")
         return
 
@@ -326,7 +403,8 @@ def main():
     user_id = st.session_state.username
     inc, exp, bal = get_finance_status(user_id)
     today_tasks = get_today_tasks(user_id)
-    today_min = today_tasks[today_tasks['end_time'].str.contains(datetime.now().strftime("%Y-%m-%d"))]['duration_min'].sum() if not today_tasks.empty else 0
+    today = datetime.now().strftime("%Y-%m-%d")
+    today_min = sum(t['duration_min'] for t in today_tasks if t['end_time'].startswith(today))
 
     render_banner()
 
@@ -344,136 +422,30 @@ def main():
             
         with c_music:
             st.write("🎵 **圣诞八音盒**")
-            music_file = "bgm.mp3" if os.path.exists("bgm.mp3") else "https://www.soundhelix.com/examples/mp3/SoundHelix-Song-15.mp3"
-            st.audio(music_file, format="audio/mp3")
+            # 本地 bgm 走静态服务：点播放才开始按 Range 拉取，rerun 不再重发 3MB 音频
+            music_url = ASSETS["bgm"] or "https://www.soundhelix.com/examples/mp3/SoundHelix-Song-15.mp3"
+            st.markdown(f'<audio controls preload="none" src="{music_url}" style="width:100%;"></audio>', unsafe_allow_html=True)
             
         with c_sys:
             st.write(f"👤 **{user_id}**")
             st.caption(f"🚀 Run: {DAYS_RUNNING} Days")
             if st.button("🚪 退出登录", type="secondary", use_container_width=True):
                 st.session_state.logged_in = False
+                auth.revoke(st.query_params.get("t"))
                 st.query_params.clear()
                 st.rerun()
 
     # HUD
     st.markdown(f"""<div style="display: flex; justify-content: space-between; background: linear-gradient(135deg, #f8f9fa 0%, #e9ecef 100%); padding: 15px 25px; border-radius: 15px; margin-bottom: 25px; box-shadow: 0 4px 15px rgba(0,0,0,0.05); border: 1px solid #fff;"><div style="text-align: center; flex: 1;"><div style="font-size:12px; color:#888">WEALTH</div><div style="font-size: 24px; font-weight: 800; color:#d63031">¥ {bal}</div></div><div style="text-align: center; flex: 1;"><div style="font-size:12px; color:#888">FOCUS</div><div style="font-size: 24px; font-weight: 800; color:#2e8b57">{today_min} min</div></div><div style="text-align: center; flex: 1;"><div style="font-size:12px; color:#888">STATUS</div><div style="font-size: 24px; font-weight: 800; color:#e17055">Level Up</div></div></div>""", unsafe_allow_html=True)
 
-    # 🚀 6大标签页
-    t1, t2, t3, t4, t5, t6 = st.tabs(["⚔️ 作战中心", "🎁 商店", "📜 日志", "🤖 AI", "📝 周报", "📊 状态调控"])
-    
-    with t1:
-        stats = get_theme_stats(user_id)
-        cols = st.columns(3) + st.columns(3)
-        for i, k in enumerate(THEME_CONFIG):
-            with cols[i]:
-                render_theme_card_christmas(k, stats[k])
-        
-        if not st.session_state.timer_active:
-            st.divider()
-            c1, c2, c3 = st.columns([2,1,1])
-            with c1: task = st.text_input("当前任务")
-            with c2: theme = st.selectbox("领域", list(THEME_CONFIG.keys()))
-            with c3: ipo = st.selectbox("阶段", ["Input", "Process", "Output"])
-            
-            if st.button("🔥 开始专注", type="primary", use_container_width=True) and task: 
-                st.session_state.timer_active=True
-                st.session_state.start_time=datetime.now()
-                st.session_state.current_theme=theme
-                st.session_state.current_task=task
-                st.session_state.current_ipo=ipo
-                st.rerun()
-        else:
-            diff = datetime.now() - st.session_state.start_time
-            mins = int(diff.total_seconds()/60)
-            secs = int(diff.total_seconds()%60)
-            
-            # 🟢 倒计时修复：强制显示动态时间
-            st.markdown(f"""
-            <div style='text-align:center; padding:30px; background:#2d3436; color:white; border-radius:15px; margin-top:20px; border: 2px solid #d63031;'>
-                <h2>🎄 专注中: {st.session_state.current_task}</h2>
-                <h1 style='font-size:60px; font-family:monospace; color:#55efc4'>{mins:02d}:{secs:02d}</h1>
-                <p>💡 请不要刷新页面，倒计时正在运行...</p>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            if st.button("🏁 完成任务", type="primary", use_container_width=True): 
-                default_scores = [5,5,5,5,5]
-                save_task(st.session_state.start_time.strftime("%Y-%m-%d %H:%M:%S"), st.session_state.current_theme, st.session_state.current_task, mins, st.session_state.current_ipo, default_scores, user_id)
-                st.session_state.timer_active=False
-                st.balloons()
-                st.rerun()
-            
-            # 🟢 倒计时修复核心：每1秒强制刷新一次，让时间走起来！
-            time.sleep(1)
-            st.rerun()
-
-    with t2:
-        cols = st.columns(4)
-        for i, item in enumerate(DEFAULT_GOODS):
-            with cols[i%4]:
-                st.markdown(f"<div class='shop-item'><h1>{item['icon']}</h1><b>{item['name']}</b><br><span style='color:#d63031; font-weight:bold;'>¥ {item['price']}</span></div>", unsafe_allow_html=True)
-                if st.button("🎁 兑换", key=f"b{i}", use_container_width=True):
-                    if bal >= item['price']: 
-                        buy_item(item['name'], item['price'], user_id)
-                        st.balloons()
-                        time.sleep(1)
-                        st.rerun()
-                    else: st.error("金币不够啦")
-    with t3: 
-        st.dataframe(get_today_tasks(user_id)[['end_time','theme','task_name','duration_min','ipo_stage']], hide_index=True, use_container_width=True)
-    with t4:
-        if "chat_history" not in st.session_state: st.session_state.chat_history = []
-        for msg in st.session_state.chat_history: st.chat_message(msg["role"]).write(msg["content"])
-        if prompt := st.chat_input("输入问题..."):
-            st.session_state.chat_history.append({"role": "user", "content": prompt})
-            st.chat_message("user").write(prompt)
-            with st.chat_message("assistant"):
-                with st.spinner("Thinking..."): 
-                    reply = call_deepseek_ai(prompt, st.session_state.deepseek_key)
-                    st.write(reply)
-                    st.session_state.chat_history.append({"role": "assistant", "content": reply})
-    with t5:
-        t, e, d1, d2 = get_weekly_data(user_id)
-        st.info(f"📅 统计范围: {d1} 至 {d2}")
-        if st.button("⚡ 生成本周周报"):
-            if t.empty: st.warning("本周暂无数据")
-            else:
-                with st.spinner("撰写中..."): 
-                    st.session_state.current_report = call_deepseek_ai(f"我是{user_id}。根据本周数据(专注{t['duration_min'].sum()}分钟, 消费{e['cost'].sum()}, 完成{len(t)}任务)，写一份温馨幽默的圣诞生日周报。", st.session_state.deepseek_key)
-        if "current_report" in st.session_state:
-            st.write(st.session_state.current_report)
-            if st.button("💾 归档保存"): 
-                save_weekly_report(st.session_state.current_report, user_id)
-                del st.session_state.current_report
-                st.rerun()
-        st.markdown("---")
-        st.subheader("🗄️ 往期周报档案")
-        reports = get_past_reports(user_id)
-        if reports.empty: st.caption("暂无历史存档")
-        else:
-            for i, row in reports.iterrows(): 
-                with st.expander(f"📅 {row['date']} (存档 #{row['id']})"): 
-                    st.write(row['content'])
-            
-    # === 新增：状态调控 Tab ===
-    with t6:
-        st.subheader("📊 核心状态调控中心")
-        c1, c2 = st.columns([1, 1])
-        with c1:
-            st.write("请为当下的状态打分 (0-10):")
-            scores = [st.slider(l,0,10,5, key=f"s_{i}") for i, l in enumerate(["情绪","认知","觉察","动机","人际"])]
-            st.write("")
-            if st.button("📡 同步状态数据", type="primary", use_container_width=True):
-                save_status(scores, user_id)
-        with c2:
-            st.write("当前五维能力雷达图:")
-            # 🛡️ 字体状态检测提示
-            if font_prop:
-                st.success(f"✅ 已加载字体: {font_prop.get_name()}")
-            else:
-                st.warning("⚠️ 未检测到中文字体，雷达图将暂时显示英文以防止乱码。请上传 font.ttf 修复。")
-            fig = plot_radar_v2(scores)
-            st.pyplot(fig, use_container_width=True)
+    # 🚀 6大标签页：st.tabs 会把六个 Tab 全部算一遍，这里换成分段选择器，只渲染可见的那个
+    active = st.segmented_control("标签页", list(TABS), default="⚔️ 作战中心", key="active_tab", label_visibility="collapsed") or "⚔️ 作战中心"
+    # 没渲染的 widget 状态会被 Streamlit 回收：不在状态调控页时回写一次，切回来打分不丢
+    if TABS[active] is not tab_status:
+        for k in [f"s_{i}" for i in range(5)]:
+            if k in st.session_state: st.session_state[k] = st.session_state[k]
+    with profiling.span("tab", active): TABS[active](user_id)
+    if profiling.ENABLED and user_id in profiling.ADMINS: render_admin_panel()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
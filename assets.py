@@ -0,0 +1,107 @@
+# === 静态资源管线 ===
+# 进程启动时把 banner / logo 预处理成多尺寸 WebP + JPEG/PNG、把 bgm 和 style.css 拷进 static/，
+# 文件名带内容哈希（内容变了 URL 就变），页面里只引用 URL，交给 Streamlit 静态服务按需下发：
+# 浏览器自己缓存、音频按 Range 分段拉取，每次 rerun 不再通过 websocket 重发原始字节。
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+
+import streamlit as st
+
+import profiling
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(ROOT, "static")      # .streamlit/config.toml 里开了 enableStaticServing
+URL_PREFIX = "app/static/"
+BANNER_WIDTHS = (800, 1600)
+LOGO_SIZE = 160                                  # 右下角 80px 圆形 logo 的 2 倍图
+
+log = logging.getLogger(__name__)
+
+
+def _fingerprint(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""): h.update(block)
+    return h.hexdigest()[:10]
+
+
+def _publish(path, write):
+    """write(tmp) 写到本进程独占的临时文件，再原子改名成最终文件名：崩溃或多进程同时启动都不会留下半截文件。"""
+    fd, tmp = tempfile.mkstemp(dir=STATIC_DIR, prefix=".tmp-")
+    os.close(fd)
+    try:
+        write(tmp)
+        os.chmod(tmp, 0o644)  # mkstemp 建的是 0600
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp); raise
+
+
+def _target(name, digest, ext):
+    filename = f"{name}-{digest}.{ext}"
+    return os.path.join(STATIC_DIR, filename), URL_PREFIX + filename
+
+
+def _image_variants(src, name, widths, fallback_ext):
+    """按宽度生成 WebP 和 fallback 格式（不放大）；文件都已存在时连 PIL 都不导入。返回 {格式: [(宽, url)]}。"""
+    digest = _fingerprint(src)
+    out = {ext: [(w, _target(f"{name}-{w}", digest, ext)) for w in widths] for ext in ("webp", fallback_ext)}
+    missing = [(w, path, ext) for ext, items in out.items() for w, (path, _) in items if not os.path.exists(path)]
+    if missing:
+        from PIL import Image
+        with Image.open(src) as im:
+            for w, path, ext in missing:
+                w = min(w, im.width)
+                img = im.resize((w, round(im.height * w / im.width)), Image.LANCZOS)
+                if ext == "jpg": img = img.convert("RGB")
+                _publish(path, lambda tmp: img.save(tmp, format={"webp": "WEBP", "jpg": "JPEG", "png": "PNG"}[ext], quality=82, optimize=True))
+    return {ext: [(w, url) for w, (_, url) in items] for ext, items in out.items()}
+
+
+def _copy(src, name):
+    path, url = _target(name, _fingerprint(src), os.path.splitext(src)[1].lstrip("."))
+    if not os.path.exists(path): _publish(path, lambda tmp: shutil.copyfile(src, tmp))
+    return url
+
+
+def _first(*names):
+    return next((os.path.join(ROOT, n) for n in names if os.path.exists(os.path.join(ROOT, n))), None)
+
+
+@st.cache_resource
+@profiling.timed("startup", "assets")
+def build():
+    """每个进程跑一次；各资源分开处理，哪个失败哪个就是 None（记日志），只有它回退到原来的内联方式。"""
+    found = {"banner": _first("banner.png", "banner.jpg"), "logo": _first("logo_day1.png"), "bgm": _first("bgm.mp3"), "css": _first("style.css")}
+    steps = {"css": lambda src: _copy(src, "lifeos"),
+             "banner": lambda src: _image_variants(src, "banner", BANNER_WIDTHS, "jpg"),
+             "logo": lambda src: _image_variants(src, "logo", (LOGO_SIZE,), "png"),
+             "bgm": lambda src: _copy(src, "bgm")}
+    out = dict.fromkeys(found)
+    try: os.makedirs(STATIC_DIR, exist_ok=True)
+    except OSError:
+        log.exception("cannot create %s, serving assets inline", STATIC_DIR); return out
+    for name, src in found.items():
+        if not src: continue
+        try: out[name] = steps[name](src)
+        except Exception: log.exception("asset %s (%s) failed, falling back to inline", name, src)  # 只影响这一个资源
+    return out
+
+
+@st.cache_resource
+def inline_css():
+    """静态服务不可用时的兜底：整段 CSS 内联，但文件只读一次。"""
+    with open(os.path.join(ROOT, "style.css"), encoding="utf-8") as f: return f.read()
+
+
+def srcset(variants):
+    return ", ".join(f"{url} {w}w" for w, url in variants)
+
+
+def picture_html(variants, fallback_ext, alt="", style="", sizes="100vw"):
+    largest = variants[fallback_ext][-1][1]
+    return (f'<picture><source type="image/webp" srcset="{srcset(variants["webp"])}" sizes="{sizes}">'
+            f'<img src="{largest}" srcset="{srcset(variants[fallback_ext])}" sizes="{sizes}" alt="{alt}" style="{style}" decoding="async"></picture>')
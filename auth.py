@@ -0,0 +1,175 @@
+# === 账号与会话 ===
+# 密码用加盐 scrypt 存储（工作因子可调），老的无盐 SHA-256 记录在下次登录成功时透明升级；
+# 哈希计算放进有界线程池（scrypt 计算期间释放 GIL），登录再慢也不会拖住其他会话，也不会同时吃掉太多内存。
+# 登录后发一个 HMAC 签名、带过期时间的会话令牌放在 URL 里，rerun / 刷新页面只做内存里的 O(1) 校验，不再查 users 表；
+# 退出登录记进 revoked_tokens 表，缓存里的令牌每 REVOKE_CHECK_SEC 秒回表确认一次，重启后和其他副本上同样失效。
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import db
+import profiling
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SCRYPT_N = int(os.environ.get("LIFEOS_SCRYPT_N", 2 ** 14))   # 工作因子：N=2^14, r=8 约 16MB 内存、单核几十毫秒
+SCRYPT_R, SCRYPT_P, SALT_BYTES, KEY_BYTES = 8, 1, 16, 32
+HASH_WORKERS = int(os.environ.get("LIFEOS_AUTH_WORKERS", 4))
+SESSION_TTL = int(float(os.environ.get("LIFEOS_SESSION_HOURS", 7 * 24)) * 3600)
+TOKEN_CACHE_MAX = 10000
+REVOKE_CHECK_SEC = int(os.environ.get("LIFEOS_REVOKE_CHECK_SEC", 30))   # 别的副本上退出登录，最多这么久之后在本进程生效
+SECRET_FILE = os.path.join(ROOT, ".lifeos_secret")
+
+_hash_pool = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="lifeos-auth")
+
+
+# --- 密码哈希 ---
+def _b64(raw): return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+def _unb64(text): return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * r * n + (1 << 20), dklen=KEY_BYTES)
+
+
+def _hash(password, n=None):
+    n = n or SCRYPT_N
+    salt = os.urandom(SALT_BYTES)
+    return f"scrypt${n}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(_scrypt(password, salt, n, SCRYPT_R, SCRYPT_P))}"
+
+
+def _verify(password, stored):
+    """返回 (是否匹配, 是否需要用当前参数重新哈希)。"""
+    if stored.startswith("scrypt$"):
+        _, n, r, p, salt, key = stored.split("$")
+        n, r, p = int(n), int(r), int(p)
+        ok = hmac.compare_digest(_scrypt(password, _unb64(salt), n, r, p), _unb64(key))
+        return ok, ok and (n, r, p) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    ok = hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), stored)  # 旧版无盐 SHA-256
+    return ok, ok
+
+
+def hash_password(password):
+    return _hash_pool.submit(_hash, password).result()
+
+
+def verify_password(password, stored):
+    return _hash_pool.submit(_verify, password, stored).result()
+
+
+# --- 账号 ---
+@profiling.timed("auth")
+def register(username, password):
+    hashed = hash_password(password)
+    try:
+        with db.connection() as conn: conn.execute('INSERT INTO users VALUES (?,?)', (username, hashed))
+        return True
+    except db.IntegrityError: return False
+
+
+@profiling.timed("auth")
+def login(username, password):
+    with db.connection() as conn: row = conn.execute('SELECT password FROM users WHERE username = ?', (username,)).fetchone()
+    if not row: return False
+    ok, stale = verify_password(password, row[0])
+    if stale:  # 带上旧值做条件更新：并发改密码时不会被这里覆盖
+        new = hash_password(password)
+        with db.connection() as conn: conn.execute('UPDATE users SET password = ? WHERE username = ? AND password = ?', (new, username, row[0]))
+    return ok
+
+
+# --- 会话令牌：base64(用户名).过期时间戳.HMAC ---
+def _load_secret():
+    if os.environ.get("LIFEOS_SECRET"): return os.environ["LIFEOS_SECRET"].encode()
+    try:
+        with open(SECRET_FILE, "rb") as f: return f.read()
+    except FileNotFoundError:
+        secret = secrets.token_bytes(32)
+        try:  # O_EXCL：多进程同时首次启动时只有一个能写成，其余读它写好的
+            fd = os.open(SECRET_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(fd, "wb") as f: f.write(secret)
+            return secret
+        except FileExistsError:
+            with open(SECRET_FILE, "rb") as f: return f.read()
+
+
+_secret = None
+_tokens = OrderedDict()   # token -> (用户名, 过期时间, 下次回表检查吊销的时间)：验过一次签名后直接查表
+_revoked = {}             # 本进程已知被吊销的 token -> 过期时间，省得反复查库
+_lock = threading.Lock()
+
+
+def _sign(payload):
+    global _secret
+    if _secret is None: _secret = _load_secret()
+    return _b64(hmac.new(_secret, payload.encode(), hashlib.sha256).digest())
+
+
+def _parse(token):
+    """签名正确且未过期返回 (用户名, 过期时间, 签名)，否则 None。"""
+    try:
+        user_b64, expires, nonce, sig = token.split(".")
+        if int(expires) <= time.time() or not hmac.compare_digest(_sign(f"{user_b64}.{expires}.{nonce}").encode(), sig.encode()): return None
+        return _unb64(user_b64).decode(), int(expires), sig
+    except ValueError: return None  # 格式不对、非 ASCII 字符（URL 里什么都可能出现）都按无效令牌处理
+
+
+def _is_revoked(sig):
+    with db.connection() as conn: return conn.execute("SELECT 1 FROM revoked_tokens WHERE sig = ?", (sig,)).fetchone() is not None
+
+
+def issue_token(username, ttl=None):
+    payload = f"{_b64(username.encode())}.{int(time.time()) + (ttl or SESSION_TTL)}.{secrets.token_hex(4)}"
+    token = f"{payload}.{_sign(payload)}"
+    with _lock: _remember(token, username, int(payload.split(".")[1]))
+    return token
+
+
+def _remember(token, username, expires):
+    _tokens[token] = (username, expires, time.time() + REVOKE_CHECK_SEC)
+    _tokens.move_to_end(token)
+    if len(_tokens) > TOKEN_CACHE_MAX: _tokens.popitem(last=False)
+
+
+def verify_token(token):
+    """合法、未过期且没被吊销返回用户名，否则 None。命中缓存时只有一次字典查找，每 REVOKE_CHECK_SEC 秒回表一次。"""
+    if not token: return None
+    now = time.time()
+    with _lock:
+        hit = _tokens.get(token)
+        if hit and hit[1] <= now:
+            del _tokens[token]; return None
+        if hit and hit[2] > now: return hit[0]
+        if token in _revoked: return None
+    parsed = _parse(token)
+    if parsed is None: return None
+    username, expires, sig = parsed
+    if _is_revoked(sig):
+        with _lock:
+            _tokens.pop(token, None); _revoked[token] = expires
+        return None
+    with _lock: _remember(token, username, expires)
+    return username
+
+
+def revoke(token):
+    """退出登录：写进 revoked_tokens（签名不对或已过期的令牌本来就无效，不记），同时清掉过期记录。"""
+    parsed = _parse(token) if token else None
+    now = time.time()
+    with _lock:
+        _tokens.pop(token, None)
+        if parsed: _revoked[token] = parsed[1]
+        for t in [t for t, exp in _revoked.items() if exp <= now]: del _revoked[t]
+    if parsed:
+        with db.connection() as conn:
+            conn.execute("INSERT INTO revoked_tokens (sig, expires) VALUES (?,?) ON CONFLICT(sig) DO NOTHING", (parsed[2], parsed[1]))
+            conn.execute("DELETE FROM revoked_tokens WHERE expires <= ?", (int(now),))
+
+
+def stats():
+    with _lock: return {"tokens": len(_tokens), "revoked": len(_revoked)}
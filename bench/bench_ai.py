@@ -0,0 +1,52 @@
+# === AI 客户端延迟 / 吞吐：首 token 时间、整段耗时、并发请求数 ===
+# 用法: python bench/bench_ai.py --requests 200 --concurrency 20 [--fail-rate 0.1]
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import mock_deepseek  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, default=20)
+    ap.add_argument("--first-token-ms", type=float, default=300)
+    ap.add_argument("--tokens-per-sec", type=float, default=200)
+    ap.add_argument("--fail-rate", type=float, default=0.0)
+    a = ap.parse_args()
+
+    server, url = mock_deepseek.serve(first_token_ms=a.first_token_ms, tokens_per_sec=a.tokens_per_sec, fail_rate=a.fail_rate)
+    os.environ["LIFEOS_DEEPSEEK_URL"] = url
+    os.environ["LIFEOS_AI_CACHE"] = tempfile.mkdtemp()
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import ai_client
+
+    def one(i, cache=False):
+        t0 = time.perf_counter(); first = None; text = []
+        for chunk in ai_client.stream_chat([{"role": "user", "content": f"周报 #{i}"}], "bench-key", cache=cache):
+            if first is None: first = time.perf_counter() - t0
+            text.append(chunk)
+        return first, time.perf_counter() - t0, "".join(text).startswith(("API报错", "\n\n⚠️"))
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(a.concurrency) as pool: results = list(pool.map(one, range(a.requests)))
+    wall = time.perf_counter() - t0
+    ttft = sorted(r[0] for r in results); total = sorted(r[1] for r in results)
+    print(f"{a.requests} 个请求 / 并发 {a.concurrency}: {a.requests / wall:.1f} req/s, 失败 {sum(r[2] for r in results)}")
+    print(f"首 token  p50 {statistics.median(ttft) * 1000:.0f} ms  p95 {ttft[int(len(ttft) * 0.95)] * 1000:.0f} ms")
+    print(f"整段回复  p50 {statistics.median(total) * 1000:.0f} ms  p95 {total[int(len(total) * 0.95)] * 1000:.0f} ms")
+
+    one("cached", cache=True)
+    hit = one("cached", cache=True)
+    print(f"磁盘缓存命中: {hit[1] * 1000:.2f} ms")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
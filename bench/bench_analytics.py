@@ -0,0 +1,55 @@
+# === 分析库：全量 / 增量导出耗时，趋势视图冷 / 热 / 增量后延迟，对比直接 pd.read_sql_query 全表 ===
+# 用法: python bench/bench_analytics.py --rows 1000000 --users 1000
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import synth  # noqa: E402
+import analytics  # noqa: E402
+import db  # noqa: E402
+
+
+def views(user, out_dir):
+    t0 = time.perf_counter()
+    analytics.rolling_focus(user, out_dir=out_dir); analytics.ipo_mix(user, out_dir=out_dir); analytics.snap_correlation(user, out_dir=out_dir)
+    return (time.perf_counter() - t0) * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--users", type=int, default=1000)
+    ap.add_argument("--new-rows", type=int, default=1000, help="增量导出前新写入的任务数")
+    a = ap.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    path, out_dir = os.path.join(tmp, "bench.db"), os.path.join(tmp, "analytics")
+    synth.build(path, a.rows, a.users).close()
+    conn = db.open_connection(path)
+    user = conn.execute("SELECT user_id FROM task_log GROUP BY user_id ORDER BY COUNT(*) DESC LIMIT 1").fetchone()[0]
+
+    import pandas as pd
+    t0 = time.perf_counter()
+    df = pd.read_sql_query("SELECT * FROM task_log", conn)
+    print(f"基线 pd.read_sql_query 全表 {len(df)} 行: {time.perf_counter() - t0:.2f}s"); del df
+
+    t0 = time.perf_counter()
+    res = analytics.export(conn, out_dir)
+    print(f"首次全量导出: {time.perf_counter() - t0:.1f}s  {res}")
+    print(f"视图（{user}）冷: {views(user, out_dir):.1f}ms  热: {views(user, out_dir):.2f}ms")
+
+    for i in range(a.new_rows):
+        db.insert_task(conn, synth.datetime.now().strftime(synth.FMT), synth.datetime.now().strftime(synth.FMT), "核心能力", "new", 30, "Output", [7] * 5, user if i % 10 == 0 else f"user{i % a.users}")
+    conn.commit()
+    misses = analytics._partial.cache_info().misses
+    t0 = time.perf_counter()
+    res = analytics.export(conn, out_dir)
+    print(f"增量导出 {a.new_rows} 行: {(time.perf_counter() - t0) * 1000:.0f}ms  {res}")
+    print(f"增量后视图: {views(user, out_dir):.1f}ms（新读分区文件 {analytics._partial.cache_info().misses - misses} 个）")
+
+
+if __name__ == "__main__":
+    main()
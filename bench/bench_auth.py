@@ -0,0 +1,78 @@
+# === 登录吞吐：不同 scrypt 工作因子下的登录/秒，对比旧版 SHA-256；外加会话令牌校验开销 ===
+# 用法: python bench/bench_auth.py --n 16384 --threads 8 --logins 200
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import harness  # noqa: E402
+import synth  # noqa: E402
+
+
+def run_logins(auth, users, threads, logins):
+    lat, lock = [], threading.Lock()
+    def worker(t):
+        for i in range(logins // threads):
+            u = users[(t + i) % len(users)]
+            t0 = time.perf_counter()
+            assert auth.login(u, "pw")
+            with lock: lat.append(time.perf_counter() - t0)
+    ts = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    t0 = time.perf_counter()
+    for t in ts: t.start()
+    for t in ts: t.join()
+    wall = time.perf_counter() - t0
+    lat.sort()
+    return len(lat) / wall, lat[len(lat) // 2] * 1000, lat[int(len(lat) * 0.99)] * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, nargs="+", default=[2 ** 12, 2 ** 14, 2 ** 15])
+    ap.add_argument("--threads", type=int, default=8)
+    ap.add_argument("--logins", type=int, default=200)
+    ap.add_argument("--users", type=int, default=50)
+    args = ap.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "auth.db")
+    synth.build(path, 0, users=1).close()
+    harness.use_db(path)
+    import auth
+    import db
+    users = [f"u{i}" for i in range(args.users)]
+
+    print(f"{args.threads} 线程并发登录 {args.logins} 次, 哈希线程池 {auth.HASH_WORKERS}")
+    with db.connection() as conn:
+        conn.executemany("INSERT OR REPLACE INTO users VALUES (?,?)", ((u, hashlib.sha256(b"pw").hexdigest()) for u in users))
+    # 旧记录第一次登录会顺带升级，先全部登一遍让下面测到的都是稳态
+    for n in args.n:
+        auth.SCRYPT_N = n
+        for u in users: auth.login(u, "pw")
+        rate, p50, p99 = run_logins(auth, users, args.threads, args.logins)
+        print(f"  scrypt N={n:<6} {rate:8.1f} 次/秒   p50 {p50:7.1f}ms   p99 {p99:7.1f}ms")
+
+    legacy = hashlib.sha256(b"pw").hexdigest()
+    t0 = time.perf_counter()
+    for _ in range(args.logins): hashlib.sha256(b"pw").hexdigest() == legacy
+    print(f"  旧版 SHA-256   {args.logins / (time.perf_counter() - t0):8.0f} 次/秒（无盐，仅作参照）")
+
+    token = auth.issue_token("u0")
+    auth.verify_token(token)
+    loops = 100000
+    t0 = time.perf_counter()
+    for _ in range(loops): auth.verify_token(token)
+    cached = (time.perf_counter() - t0) / loops * 1e6
+    auth._tokens.clear()
+    t0 = time.perf_counter()
+    for _ in range(loops // 10):
+        auth.verify_token(token); auth._tokens.clear()
+    cold = (time.perf_counter() - t0) / (loops // 10) * 1e6
+    print(f"会话令牌校验: 命中缓存 {cached:.2f}µs, 未命中（验签 + 查吊销表）{cold:.2f}µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# === 索引迁移前后查询耗时对比 ===
+# 用法: python bench/bench_indexes.py --rows 1000000
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import synth  # noqa: E402
+import db  # noqa: E402
+
+WEEK_AGO = (datetime.now() - timedelta(days=7)).strftime(synth.FMT)
+QUERIES = {  # 和 app.py 里的读路径一一对应
+    "finance.task_sum": ("SELECT SUM(duration_min) FROM task_log WHERE user_id=?", lambda u: (u,)),
+    "finance.expense_sum": ("SELECT SUM(cost) FROM expense_log WHERE user_id=?", lambda u: (u,)),
+    "theme_stats": ("SELECT theme, SUM(duration_min) FROM task_log WHERE user_id=? GROUP BY theme", lambda u: (u,)),
+    "today_tasks": ("SELECT * FROM task_log WHERE user_id=? ORDER BY id DESC LIMIT 10", lambda u: (u,)),
+    "weekly.tasks": ("SELECT * FROM task_log WHERE user_id=? AND start_time > ?", lambda u: (u, WEEK_AGO)),
+    "weekly.expenses": ("SELECT * FROM expense_log WHERE user_id=? AND date > ?", lambda u: (u, WEEK_AGO)),
+    "past_reports": ("SELECT * FROM weekly_reports WHERE user_id=? ORDER BY id DESC", lambda u: (u,)),
+}
+
+
+def run(conn, users, repeat):
+    out = {}
+    for name, (sql, params) in QUERIES.items():
+        samples = []
+        for u in users[:repeat]:
+            t0 = time.perf_counter(); conn.execute(sql, params(u)).fetchall(); samples.append(time.perf_counter() - t0)
+        out[name] = statistics.median(samples) * 1000
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--users", type=int, default=1000)
+    ap.add_argument("--repeat", type=int, default=20, help="每条查询抽样的用户数")
+    a = ap.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    t0 = time.perf_counter()
+    conn = synth.build(path, a.rows, a.users, schema=1)
+    print(f"生成 {a.rows} 行用时 {time.perf_counter() - t0:.1f}s")
+    users = [f"user{i}" for i in random.Random(1).sample(range(a.users), min(a.repeat, a.users))]
+
+    before = run(conn, users, a.repeat)
+    t0 = time.perf_counter(); db.migrate(conn)
+    print(f"迁移到 v{db.schema_version(conn)} 用时 {time.perf_counter() - t0:.1f}s")
+    after = run(conn, users, a.repeat)
+
+    print(f"{'query':<22}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for name in QUERIES:
+        print(f"{name:<22}{before[name]:>12.3f}{after[name]:>12.3f}{before[name] / max(after[name], 1e-6):>9.0f}x")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
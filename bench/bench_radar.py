@@ -0,0 +1,71 @@
+# === 雷达图渲染：旧版 Matplotlib 每次新建 figure vs SVG + lru_cache ===
+# 用法: python bench/bench_radar.py --reruns 10000
+# 每种模式在独立子进程里跑，RSS 互不干扰；legacy 模式需要本地装有 matplotlib。
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def rss_mb():
+    with open("/proc/self/statm") as f: return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def legacy_render(scores):
+    # 原 plot_radar_v2 + st.pyplot 的主要开销：新建 figure 并栅格化，且从不 close
+    import io
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import numpy as np
+    angles = np.linspace(0, 2 * np.pi, 5, endpoint=False).tolist()
+    scores_plot = scores + scores[:1]; angles += angles[:1]
+    fig, ax = plt.subplots(figsize=(4, 4), subplot_kw=dict(polar=True))
+    fig.patch.set_alpha(0); ax.set_facecolor('#f8f9fa'); ax.spines['polar'].set_visible(False)
+    ax.set_xticks(angles[:-1]); ax.set_xticklabels(['Emotion', 'Cognition', 'Awareness', 'Motivation', 'Social'], fontsize=10, fontweight='bold'); ax.set_yticklabels([])
+    color = '#2e8b57' if sum(scores) / 5 >= 6 else '#d63031'
+    ax.fill(angles, scores_plot, color=color, alpha=0.3); ax.plot(angles, scores_plot, color=color, linewidth=2)
+    fig.savefig(io.BytesIO(), format="png")
+
+
+def svg_render(scores):
+    sys.path.insert(0, ROOT)
+    import radar
+    radar.radar_svg(tuple(scores))
+
+
+def child(mode, reruns, distinct):
+    render = legacy_render if mode == "legacy" else svg_render
+    rng = random.Random(0)
+    pool = [[rng.randint(0, 10) for _ in range(5)] for _ in range(distinct)]  # 真实使用中同一组分数会反复出现
+    t_import = time.perf_counter(); render(pool[0]); t_import = time.perf_counter() - t_import
+    rss0 = rss_mb(); samples = []
+    for i in range(reruns):
+        t0 = time.perf_counter(); render(list(pool[i % distinct])); samples.append(time.perf_counter() - t0)
+    samples.sort()
+    print(json.dumps(dict(mode=mode, first_ms=t_import * 1000, p50_ms=samples[len(samples) // 2] * 1000, p99_ms=samples[int(len(samples) * 0.99)] * 1000,
+                          total_s=sum(samples), rss_start_mb=rss0, rss_end_mb=rss_mb())))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--reruns", type=int, default=10_000)
+    ap.add_argument("--distinct", type=int, default=200, help="不同分数组合的个数")
+    ap.add_argument("--modes", default="legacy,svg")
+    ap.add_argument("--child", help=argparse.SUPPRESS)
+    a = ap.parse_args()
+    if a.child: return child(a.child, a.reruns, a.distinct)
+    for mode in a.modes.split(","):
+        out = subprocess.run([sys.executable, __file__, "--child", mode, "--reruns", str(a.reruns), "--distinct", str(a.distinct)], capture_output=True, text=True)
+        if out.returncode: print(f"{mode}: 失败\n{out.stderr.strip().splitlines()[-1]}"); continue
+        r = json.loads(out.stdout)
+        print(f"{mode:<7} first {r['first_ms']:8.1f} ms  p50 {r['p50_ms']:8.3f} ms  p99 {r['p99_ms']:8.3f} ms  total {r['total_s']:7.2f} s  RSS {r['rss_start_mb']:.0f} -> {r['rss_end_mb']:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# === 冷启动：导入耗时 + 登录页首次渲染（time-to-first-paint 的服务端部分）===
+# 用法: python bench/bench_startup.py [--top 15]
+# 每项都在全新子进程里测，避免模块缓存干扰。
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import harness  # noqa: E402
+
+HEAVY = ["pandas", "numpy", "matplotlib", "requests", "PIL", "pyarrow"]
+
+FIRST_PAINT = """
+import json, os, sys, time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+t_st = time.perf_counter() - t0
+at = AppTest.from_file({app!r}, default_timeout=120)
+t1 = time.perf_counter(); at.run(); cold = time.perf_counter() - t1
+assert not at.exception, at.exception
+t2 = time.perf_counter(); at.run(); warm = time.perf_counter() - t2
+print(json.dumps(dict(streamlit_import=t_st, login_cold=cold, login_warm=warm, loaded=[m for m in {heavy!r} if m in sys.modules])))
+"""
+
+
+def app_modules():
+    """app.py 顶层 import 的本仓库模块（按源码解析，app 新加依赖时不用改这里）。"""
+    with open(harness.APP, encoding="utf-8") as f: tree = ast.parse(f.read())
+    names = {alias.name.split(".")[0] for node in tree.body if isinstance(node, ast.Import) for alias in node.names}
+    names |= {node.module.split(".")[0] for node in tree.body if isinstance(node, ast.ImportFrom) and node.module}
+    return sorted(n for n in names if os.path.exists(os.path.join(harness.ROOT, f"{n}.py")))
+
+
+def import_profile(top):
+    """python -X importtime：app.py 依赖的模块里，按累计耗时排前 top 的顶层包。"""
+    code = f"import sys; sys.path.insert(0, {harness.ROOT!r}); import streamlit; import {', '.join(app_modules())}"
+    err = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, env=_env()).stderr
+    rows = []
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line: continue
+        _, cum_us, name = line.replace("import time:", "").split("|")
+        if len(name) - len(name.lstrip()) == 1: rows.append((int(cum_us), name.strip()))  # 缩进 1 格 = 顶层导入
+    return sorted(rows, reverse=True)[:top]
+
+
+def _env():
+    return dict(os.environ, LIFEOS_DB=os.path.join(tempfile.mkdtemp(), "startup.db"))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--top", type=int, default=15)
+    a = ap.parse_args()
+
+    print("== 顶层模块累计导入耗时 (python -X importtime) ==")
+    for cum, name in import_profile(a.top): print(f"{cum / 1000:9.1f} ms  {name}")
+
+    out = subprocess.run([sys.executable, "-c", FIRST_PAINT.format(app=harness.APP, heavy=HEAVY)], capture_output=True, text=True, env=_env())
+    if out.returncode: sys.exit(out.stderr)
+    r = json.loads(out.stdout.strip().splitlines()[-1])
+    print("== 登录页 (AppTest 无头渲染) ==")
+    print(f"import streamlit      {r['streamlit_import'] * 1000:8.1f} ms")
+    print(f"首次渲染 (冷)        {r['login_cold'] * 1000:8.1f} ms")
+    print(f"再次渲染 (热)        {r['login_warm'] * 1000:8.1f} ms")
+    print(f"登录页已加载的重型库  {', '.join(r['loaded']) or '无'}")
+
+
+if __name__ == "__main__":
+    main()
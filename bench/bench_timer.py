@@ -0,0 +1,105 @@
+# === 专注计时器服务端开销：旧版每秒整页 rerun vs 浏览器端计时 ===
+# before 是真跑出来的：把改动前的版本（LEGACY_REV）git archive 到临时目录，在子进程里用 AppTest 跑它的
+# time.sleep(1) + st.rerun() 循环 --ticks 次（sleep 本身不耗 CPU，直接跳过）；after 是当前版本计时期间的服务端开销。
+# 用法: python bench/bench_timer.py --rows 100000 --ticks 30
+import argparse
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import harness  # noqa: E402
+import synth  # noqa: E402
+
+LEGACY_REV = "6039605^"   # 改成浏览器端计时之前的最后一个提交
+LEGACY_SCHEMA = 3         # 那个版本的 db.py 迁移到第 3 版
+
+
+class StopTicks(Exception):
+    pass
+
+
+def legacy_worker(src, path, ticks):
+    """在子进程里跑旧版 app.py：登录状态 / 计时状态直接塞进 session_state，数 ticks 次每秒 rerun 的 CPU。"""
+    os.chdir(src); sys.path.insert(0, src)
+    os.environ["LIFEOS_DB"] = path
+    from datetime import datetime
+    from streamlit.testing.v1 import AppTest
+    app_file = os.path.join(src, "app.py")
+    real_sleep, count, marks = time.sleep, [0], []
+
+    def sleep(sec):
+        # 只拦旧版计时循环里的那一次 sleep(1)，AppTest 自己的等待照常
+        if sys._getframe(1).f_code.co_filename != app_file or sec != 1: return real_sleep(sec)
+        marks.append(time.thread_time())  # 脚本线程的 CPU：每两次 sleep 之间就是一次完整 rerun
+        count[0] += 1
+        if count[0] > ticks: raise StopTicks
+    time.sleep = sleep
+
+    at = AppTest.from_file(app_file, default_timeout=600)
+    at.query_params["user"] = "user1"
+    at.session_state.timer_active = True
+    at.session_state.start_time = datetime.now()
+    at.session_state.current_task, at.session_state.current_theme, at.session_state.current_ipo = "bench", "核心能力", "Input"
+    at.run()
+    return [b - a for a, b in zip(marks, marks[1:])]
+
+
+def legacy_cost(rows, ticks, rev):
+    """导出旧版源码、建旧 schema 的库，起子进程测，返回每次 rerun 的 CPU 秒数列表。"""
+    src = tempfile.mkdtemp(prefix="lifeos-legacy-")
+    # banner / bgm 也带上：旧版每次 rerun 都要把它们 base64 内联进页面，这是旧版开销的一部分
+    archive = subprocess.run(["git", "archive", rev, "app.py", "db.py", "banner.jpg", "bgm.mp3"], cwd=harness.ROOT, capture_output=True, check=True)
+    tarfile.open(fileobj=io.BytesIO(archive.stdout)).extractall(src)
+    path = os.path.join(src, "bench.db")
+    synth.build(path, rows, schema=LEGACY_SCHEMA).close()
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--legacy-worker", src, path, "--ticks", str(ticks)], capture_output=True, text=True)
+    if proc.returncode != 0: sys.exit(f"旧版 worker 失败:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--ticks", type=int, default=30, help="采样多少次整页 rerun")
+    ap.add_argument("--focus-min", type=int, default=25, help="一次专注的时长，用于摊销开始/完成两次 rerun")
+    ap.add_argument("--legacy-rev", default=LEGACY_REV, help="作为 before 的旧版本提交")
+    ap.add_argument("--legacy-worker", nargs=2, help=argparse.SUPPRESS)
+    a = ap.parse_args()
+
+    if a.legacy_worker:
+        print(json.dumps(legacy_worker(*a.legacy_worker, a.ticks)))
+        return
+
+    legacy = legacy_cost(a.rows, a.ticks, a.legacy_rev)
+    per_tick = statistics.mean(legacy)
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    synth.build(path, a.rows).close()
+    harness.use_db(path)
+    at = harness.start_focus(harness.login(harness.new_app(), "user1"))
+
+    # 当前版本：计时期间服务端不 rerun，只有开始 + 完成两次；另外量一下计时中手动触发的普通 rerun 作参照
+    cpu = []
+    for _ in range(a.ticks):
+        t0 = time.process_time(); harness.check(at.run()); cpu.append(time.process_time() - t0)
+    t0 = time.process_time(); harness.click(at, "🏁 完成任务"); finish = time.process_time() - t0
+    focus_sec = a.focus_min * 60
+    before = per_tick * focus_sec
+    after = statistics.mean(cpu) + finish
+
+    p95 = lambda xs: sorted(xs)[max(0, int(len(xs) * 0.95) - 1)] * 1000
+    print(f"旧版（{a.legacy_rev}）每秒 rerun 实测 {len(legacy)} 次 CPU: mean {per_tick * 1000:.1f} ms, p95 {p95(legacy):.1f} ms")
+    print(f"当前版本计时中一次 rerun CPU: mean {statistics.mean(cpu) * 1000:.1f} ms, p95 {p95(cpu):.1f} ms")
+    print(f"每个计时器 {a.focus_min} 分钟内的服务端 CPU: before {before:.1f}s ({before / focus_sec * 100:.1f}% 单核，按实测每次 rerun × {focus_sec} 秒)"
+          f"  after {after:.3f}s ({after / focus_sec * 100:.4f}% 单核)")
+
+
+if __name__ == "__main__":
+    main()
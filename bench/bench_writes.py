@@ -0,0 +1,75 @@
+# === 写吞吐：逐次连接提交 vs 连接池逐条提交 vs 写入队列 group commit ===
+# 用法: python bench/bench_writes.py --users 50 --writes 200
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import synth  # noqa: E402
+import db  # noqa: E402
+import ingest  # noqa: E402
+
+NOW = "2026-01-01 10:00:00"
+
+
+def legacy_writer(path):
+    # 原来的写法：每次 connect → INSERT → commit → close，默认回滚日志 + synchronous=FULL
+    def write(user):
+        conn = sqlite3.connect(path, timeout=30)
+        db.insert_task(conn, NOW, NOW, "核心能力", "bench", 25, "Input", [5] * 5, user); conn.commit(); conn.close()
+    return write
+
+
+def pool_writer(path):
+    pool = db.ConnectionPool(path, size=16)
+    def write(user):
+        with pool.connection() as conn: db.insert_task(conn, NOW, NOW, "核心能力", "bench", 25, "Input", [5] * 5, user)
+    return write
+
+
+def queue_writer(path):
+    q = ingest.WriteQueue(path)
+    def write(user): q.write(db.insert_task, NOW, NOW, "核心能力", "bench", 25, "Input", [5] * 5, user)
+    write.queue = q
+    return write
+
+
+def run(name, make, users, writes):
+    path = os.path.join(tempfile.mkdtemp(), f"{name}.db")
+    conn = synth.build(path, 0, users)
+    if name == "legacy": conn.execute("PRAGMA journal_mode=DELETE")
+    conn.close()
+    write = make(path)
+    lat, errors = [], []
+    def worker(u):
+        for _ in range(writes):
+            t0 = time.perf_counter()
+            try: write(f"user{u}")
+            except sqlite3.OperationalError as e: errors.append(e)
+            lat.append(time.perf_counter() - t0)
+    threads = [threading.Thread(target=worker, args=(u,)) for u in range(users)]
+    t0 = time.perf_counter()
+    for t in threads: t.start()
+    for t in threads: t.join()
+    wall = time.perf_counter() - t0
+    lat.sort()
+    extra = f"  平均每批 {write.queue.ops / write.queue.batches:.1f} 条" if hasattr(write, "queue") else ""
+    print(f"{name:<7} {users * writes / wall:9.0f} writes/s  p50 {lat[len(lat) // 2] * 1000:7.2f} ms  p99 {lat[int(len(lat) * 0.99)] * 1000:8.2f} ms  失败 {len(errors)}{extra}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--users", type=int, default=50, help="并发模拟用户（线程）数")
+    ap.add_argument("--writes", type=int, default=200, help="每个用户写多少条")
+    ap.add_argument("--modes", default="legacy,pool,queue")
+    a = ap.parse_args()
+    makers = {"legacy": legacy_writer, "pool": pool_writer, "queue": queue_writer}
+    for name in a.modes.split(","): run(name, makers[name], a.users, a.writes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# === AppTest 无头驱动：benchmark 共用的登录 / 点击小工具 ===
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "app.py")
+
+
+def use_db(target):
+    """让 app.py 连到指定的库（SQLite 文件路径或 postgresql:// URL）；要在 app 第一次建连接池之前调用。"""
+    key, attr = ("LIFEOS_DB_URL", "DB_URL") if target.startswith(("postgresql://", "postgres://")) else ("LIFEOS_DB", "DB_PATH")
+    os.environ[key] = target
+    if ROOT not in sys.path: sys.path.insert(0, ROOT)
+    if "db" in sys.modules: setattr(sys.modules["db"], attr, target)
+
+
+def new_app(timeout=60):
+    from streamlit.testing.v1 import AppTest
+    return AppTest.from_file(APP, default_timeout=timeout)
+
+
+def check(at):
+    if at.exception: raise RuntimeError(at.exception[0].message)
+    return at
+
+
+def click(at, label):
+    next(b for b in at.button if b.label == label).click()
+    return check(at.run())
+
+
+def login(at, user, password="bench"):
+    """先注册（已存在也无妨）再登录，返回已进入主界面的 AppTest。"""
+    check(at.run())
+    at.text_input(key="reg_user").input(user); at.text_input(key="reg_pass").input(password)
+    click(at, "✨ 创建账号")
+    at.text_input(key="login_user").input(user); at.text_input(key="login_pass").input(password)
+    return click(at, "🚀 进入系统")
+
+
+def start_focus(at, task="bench task"):
+    next(t for t in at.text_input if t.label == "当前任务").input(task)
+    return click(at, "🔥 开始专注")
+
+
+def goto_tab(at, name):
+    at.button_group(key="active_tab").set_value(name)
+    return check(at.run())
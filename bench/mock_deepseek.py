@@ -0,0 +1,65 @@
+# === 本地 DeepSeek 模拟服务：离线测试流式输出、超时和重试 ===
+# 用法: python bench/mock_deepseek.py --port 8765 --first-token-ms 300 --tokens-per-sec 40
+#       LIFEOS_DEEPSEEK_URL=http://127.0.0.1:8765 streamlit run app.py
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY = "🎄 这周你专注得像圣诞老人赶工一样认真！继续保持，下周也要记得好好休息、多喝快乐水。"
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # 支持 keep-alive，才能体现客户端连接复用
+    cfg = argparse.Namespace(first_token_ms=300, tokens_per_sec=40, fail_rate=0.0)
+
+    def log_message(self, *args): pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if random.random() < self.cfg.fail_rate:
+            return self._send(503, "application/json", b'{"error":"overloaded"}')
+        time.sleep(self.cfg.first_token_ms / 1000)
+        tokens = [REPLY[i:i + 2] for i in range(0, len(REPLY), 2)]
+        if not body.get("stream"):
+            msg = {"choices": [{"message": {"role": "assistant", "content": REPLY}}]}
+            return self._send(200, "application/json", json.dumps(msg, ensure_ascii=False).encode())
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream"); self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for tok in tokens:
+            self._chunk(f"data: {json.dumps({'choices': [{'delta': {'content': tok}}]}, ensure_ascii=False)}\n\n")
+            time.sleep(1 / self.cfg.tokens_per_sec)
+        self._chunk("data: [DONE]\n\n"); self.wfile.write(b"0\r\n\r\n")
+
+    def _chunk(self, text):
+        data = text.encode()
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n"); self.wfile.flush()
+
+    def _send(self, code, ctype, data):
+        self.send_response(code); self.send_header("Content-Type", ctype); self.send_header("Content-Length", str(len(data)))
+        self.end_headers(); self.wfile.write(data)
+
+
+def serve(port=0, **cfg):
+    """在后台线程启动，返回 (server, base_url)；port=0 时随机挑一个空闲端口。"""
+    Handler.cfg = argparse.Namespace(**dict(vars(Handler.cfg), **cfg))
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--first-token-ms", type=float, default=300)
+    ap.add_argument("--tokens-per-sec", type=float, default=40)
+    ap.add_argument("--fail-rate", type=float, default=0.0, help="按比例返回 503，用来观察重试")
+    a = ap.parse_args()
+    server, url = serve(a.port, first_token_ms=a.first_token_ms, tokens_per_sec=a.tokens_per_sec, fail_rate=a.fail_rate)
+    print(f"mock DeepSeek listening on {url}")
+    try: threading.Event().wait()
+    except KeyboardInterrupt: server.shutdown()
@@ -0,0 +1,114 @@
+# === 兑换并发压测：多进程 × 多线程同时抢购，校验余额永不为负、重复提交只扣一次 ===
+# 每个进程各自一条写入队列（相当于多开几个 Streamlit 进程），进程之间靠 BEGIN IMMEDIATE 串行化。
+# 用法: python bench/stress_purchase.py --procs 4 --threads 16 --attempts 50
+#       python bench/stress_purchase.py --url postgresql://localhost/lifeos_test   # 同样的压测跑在 PostgreSQL 上（模拟多副本）
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import synth  # noqa: E402
+import db  # noqa: E402
+import ingest  # noqa: E402
+
+NOW = "2026-01-01 10:00:00"
+USER = "user0"
+
+
+def shopper(target, proc, threads, attempts, price, dup_every, out):
+    q = ingest.WriteQueue(target)
+    counts = {db.PURCHASE_OK: 0, db.PURCHASE_DUPLICATE: 0, db.PURCHASE_INSUFFICIENT: 0}
+    lock = threading.Lock()
+
+    def worker(t):
+        for a in range(attempts):
+            request_id = f"p{proc}-t{t}-a{a}"
+            submits = 2 if dup_every and a % dup_every == 0 else 1  # 模拟连点：同一个幂等键并发提交两次
+            futs = [q.submit(db.purchase, NOW, "🥤 快乐水", price, USER, request_id) for _ in range(submits)]
+            for f in futs:
+                r = f.result(60)
+                with lock: counts[r] += 1
+
+    ts = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    for t in ts: t.start()
+    for t in ts: t.join()
+    out.put(counts)
+
+
+def watch(target, stop, seen):
+    # 压测期间不停读汇总表，任何一刻余额为负都记下来
+    conn = db.connect(target)
+    while not stop.is_set():
+        row = conn.execute("SELECT income - spend FROM user_summary WHERE user_id=?", (USER,)).fetchone()
+        conn.commit()  # 结束读事务，下一次读到最新提交
+        if row: seen.append(row[0])
+        time.sleep(0.001)
+    conn.close()
+
+
+def prepare(target, income):
+    """建好库并只给压测用户一笔收入；PostgreSQL 库是共用的，先清掉这个用户上一次压测留下的数据。"""
+    conn = db.connect(target)
+    db.migrate(conn)
+    with conn:
+        for table in ("task_log", "expense_log", "user_summary", "theme_summary", "purchase_requests"):
+            conn.execute(f"DELETE FROM {table} WHERE user_id=?", (USER,))
+        db.insert_task(conn, NOW, NOW, "核心能力", "stress", income, "Input", [5] * 5, USER)
+    conn.close()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--procs", type=int, default=4)
+    ap.add_argument("--threads", type=int, default=16)
+    ap.add_argument("--attempts", type=int, default=50)
+    ap.add_argument("--price", type=int, default=60)
+    ap.add_argument("--income", type=int, default=6000, help="初始金币（= 专注分钟数）")
+    ap.add_argument("--dup-every", type=int, default=5, help="每隔几次尝试模拟一次重复提交，0 关闭")
+    ap.add_argument("--url", help="postgresql:// URL；不给就用临时 SQLite 文件")
+    args = ap.parse_args()
+
+    target = args.url or os.path.join(tempfile.mkdtemp(), "stress.db")
+    if not args.url: synth.build(target, 0, users=1).close()
+    prepare(target, args.income)
+
+    # spawn 而不是 fork：父进程里已经有 sqlite 连接 / 线程时 fork 出的子进程偶尔会卡死；观察线程也等子进程都起来再开
+    ctx = mp.get_context("spawn")
+    out = ctx.Queue()
+    t0 = time.perf_counter()
+    procs = [ctx.Process(target=shopper, args=(target, p, args.threads, args.attempts, args.price, args.dup_every, out)) for p in range(args.procs)]
+    for p in procs: p.start()
+    stop, seen = threading.Event(), []
+    watcher = threading.Thread(target=watch, args=(target, stop, seen)); watcher.start()
+    results = [out.get() for _ in procs]
+    for p in procs: p.join()
+    wall = time.perf_counter() - t0
+    stop.set(); watcher.join()
+
+    total = {k: sum(r[k] for r in results) for k in results[0]}
+    conn = db.connect(target)
+    income, spend = conn.execute("SELECT income, spend FROM user_summary WHERE user_id=?", (USER,)).fetchone()
+    rows = conn.execute("SELECT COUNT(*) FROM expense_log WHERE user_id=?", (USER,)).fetchone()[0]
+    keyed = conn.execute("SELECT COUNT(*) FROM purchase_requests r JOIN expense_log e ON e.id = r.expense_id WHERE r.user_id=?", (USER,)).fetchone()[0]
+    diffs = db.verify_summaries(conn)
+    conn.close()
+
+    print(f"{args.procs} 进程 × {args.threads} 线程, {wall:.2f}s: 成交 {total[db.PURCHASE_OK]}  重复 {total[db.PURCHASE_DUPLICATE]}  余额不足 {total[db.PURCHASE_INSUFFICIENT]}")
+    print(f"收入 {income}  支出 {spend}  余额 {income - spend}  采样 {len(seen)} 次, 最低余额 {min(seen, default=income - spend)}")
+    failures = []
+    if income - spend < 0 or any(b < 0 for b in seen): failures.append("余额出现负数")
+    if rows != total[db.PURCHASE_OK] or spend != rows * args.price: failures.append("成交笔数和流水 / 支出对不上")
+    if total[db.PURCHASE_OK] != min(args.income // args.price, args.procs * args.threads * args.attempts): failures.append("该成交的没成交")
+    if keyed != rows: failures.append("幂等键和流水不是一一对应")
+    if diffs: failures.append(f"汇总表不一致: {diffs[:3]}")
+    for f in failures: print("FAIL:", f)
+    if not failures: print("OK")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+# === 回归基准套件：合成库 × 典型操作，输出 JSON 方便跨提交对比 ===
+# 每个数据规模单独起一个子进程（RSS、连接池、缓存互不干扰），用 AppTest 无头驱动 main()：
+# 登录 / 计时中 rerun / 商城兑换 / 周报页 / 雷达页，记录每次 rerun 的延迟分位数、SQL 语句数和峰值 RSS。
+# 用法:
+#   python bench/suite.py --sizes 10k 1m 10m --out bench-$(git rev-parse --short HEAD).json
+#   python bench/suite.py --sizes 10k --compare old.json      # 和之前的结果逐项对比
+#   python bench/suite.py --sizes 10k --url postgresql://...  # 换成 PostgreSQL 后端（每个规模重新灌数）
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import harness  # noqa: E402
+
+FLOWS = ("login", "timer_tick", "shop_purchase", "weekly_tab", "radar_tab")
+
+
+def parse_size(text):
+    text = text.lower().replace("_", "")
+    mult = {"k": 1_000, "m": 1_000_000}.get(text[-1], 1)
+    return int(float(text.rstrip("km")) * mult)
+
+
+def percentiles(samples):
+    s = sorted(samples)
+    pick = lambda q: round(s[min(len(s) - 1, int(len(s) * q))], 2)
+    return {"n": len(s), "p50": pick(0.5), "p90": pick(0.9), "p99": pick(0.99), "max": round(s[-1], 2)}
+
+
+# --- 子进程：跑一个数据规模 ---
+class SqlCounter:
+    """挂在每条新连接上的 trace 回调：按语句类型计数（两种后端的连接池、写线程都经过 profiling.trace）。"""
+    def __init__(self):
+        self.total = self.selects = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, sql):
+        with self._lock:
+            self.total += 1
+            if sql.lstrip()[:6].upper() == "SELECT": self.selects += 1
+
+    def snapshot(self):
+        with self._lock: return self.total, self.selects
+
+
+def instrument(counter):
+    import profiling
+    trace = profiling.trace
+    def traced(conn):
+        conn = trace(conn)
+        conn.set_trace_callback(counter)
+        return conn
+    profiling.trace = traced
+
+
+class Recorder:
+    def __init__(self, counter):
+        self.counter, self.flows = counter, {}
+
+    def run(self, flow, at, action=None):
+        """计一次 rerun：action 负责设置控件（点按钮 / 切标签 / 拖滑块），不给就是纯 rerun。"""
+        (q0, s0), w0, c0 = self.counter.snapshot(), time.perf_counter(), time.process_time()
+        harness.check(action() if action else at.run())
+        (q1, s1), w1, c1 = self.counter.snapshot(), time.perf_counter(), time.process_time()
+        rec = self.flows.setdefault(flow, {"wall_ms": [], "cpu_ms": [], "sql": [], "selects": []})
+        rec["wall_ms"].append((w1 - w0) * 1000); rec["cpu_ms"].append((c1 - c0) * 1000)
+        rec["sql"].append(q1 - q0); rec["selects"].append(s1 - s0)
+        return at
+
+    def summary(self):
+        return {flow: {"wall_ms": percentiles(r["wall_ms"]), "cpu_ms": percentiles(r["cpu_ms"]),
+                       "sql_per_rerun": round(sum(r["sql"]) / len(r["sql"]), 1),
+                       "selects_per_rerun": round(sum(r["selects"]) / len(r["selects"]), 1)}
+                for flow, r in self.flows.items()}
+
+
+def richest_user(path):
+    import db
+    conn = db.connect(path)
+    row = conn.execute("SELECT user_id FROM user_summary ORDER BY income - spend DESC LIMIT 1").fetchone()
+    conn.close()
+    return row[0] if row else "user1"
+
+
+def worker(path, iterations):
+    counter = SqlCounter()
+    harness.use_db(path)
+    instrument(counter)
+    rec = Recorder(counter)
+    user = richest_user(path)
+
+    # 登录：每次都是新会话（新 AppTest），计“进入系统”那一次 rerun
+    for i in range(iterations):
+        at = harness.new_app()
+        harness.check(at.run())
+        if i == 0:
+            at.text_input(key="reg_user").input(user); at.text_input(key="reg_pass").input("bench")
+            harness.click(at, "✨ 创建账号")
+        at.text_input(key="login_user").input(user); at.text_input(key="login_pass").input("bench")
+        rec.run("login", at, lambda: harness.click(at, "🚀 进入系统"))
+
+    # 计时中：开始专注后的普通 rerun（驾驶舱、HUD、作战中心）
+    harness.start_focus(at)
+    for _ in range(iterations): rec.run("timer_tick", at)
+    harness.click(at, "🏁 完成任务")
+
+    # 商城：每次点同一个商品（余额不足时走报错分支，同样计入）；成交后 app 里有 1 秒 sleep 等气球动画，看 cpu_ms 更准
+    harness.goto_tab(at, "🎁 商店")
+    for _ in range(iterations):
+        rec.run("shop_purchase", at, lambda: (at.button(key="b0").click(), at.run())[1])
+
+    # 周报页：第一次切过去 + 之后停留在该页的 rerun
+    for _ in range(iterations):
+        harness.goto_tab(at, "⚔️ 作战中心")
+        rec.run("weekly_tab", at, lambda: harness.goto_tab(at, "📝 周报"))
+
+    # 雷达页：每次拖动一个滑块，触发一次新的分数组合
+    harness.goto_tab(at, "📊 状态调控")
+    for i in range(iterations):
+        slider = at.slider(key=f"s_{i % 5}")
+        rec.run("radar_tab", at, lambda: slider.set_value((slider.value + 3) % 11).run())
+
+    return {"flows": rec.summary(), "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1), "user": user}
+
+
+# --- 主进程：建库、分派、汇总 ---
+def ensure_db(data_dir, rows, users, rebuild, url=None):
+    import synth
+    path = url or os.path.join(data_dir, f"synth-{rows}.db")
+    if not url and os.path.exists(path) and not rebuild: return path, 0.0
+    t0 = time.perf_counter()
+    synth.build(path, rows, users).close()
+    return path, round(time.perf_counter() - t0, 1)
+
+
+def git_commit():
+    try: return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=harness.ROOT, capture_output=True, text=True).stdout.strip() or None
+    except OSError: return None
+
+
+def compare(old, new):
+    print(f"\n对比 {old.get('commit')} → {new.get('commit')}（wall p50 / p99，SQL 条数）")
+    for size, res in new["sizes"].items():
+        before = old.get("sizes", {}).get(size)
+        if not before: continue
+        for flow, cur in res["flows"].items():
+            prev = before["flows"].get(flow)
+            if not prev: continue
+            ratio = cur["wall_ms"]["p50"] / prev["wall_ms"]["p50"] if prev["wall_ms"]["p50"] else float("inf")
+            flag = "  ⚠️ 变慢" if ratio > 1.2 else ""
+            print(f"  {size:>4} {flow:<14} p50 {prev['wall_ms']['p50']:8.1f} → {cur['wall_ms']['p50']:8.1f}ms ({ratio:4.2f}x)"
+                  f"  p99 {prev['wall_ms']['p99']:8.1f} → {cur['wall_ms']['p99']:8.1f}ms  SQL {prev['sql_per_rerun']} → {cur['sql_per_rerun']}{flag}")
+        print(f"  {size:>4} peak RSS {before['peak_rss_mb']} → {res['peak_rss_mb']} MB")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", nargs="+", default=["10k", "1m", "10m"], help="task_log 行数，如 10k 1m 10m")
+    ap.add_argument("--users", type=int, default=1000)
+    ap.add_argument("--iterations", type=int, default=20, help="每个操作采样多少次 rerun")
+    ap.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "lifeos-bench"), help="合成库缓存目录，已存在就复用")
+    ap.add_argument("--rebuild", action="store_true")
+    ap.add_argument("--url", help="postgresql:// URL：在这个库上跑（会清空其中的业务表）")
+    ap.add_argument("--out", help="结果 JSON 路径")
+    ap.add_argument("--compare", help="之前的结果 JSON，打印逐项对比")
+    ap.add_argument("--worker", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.worker:
+        print(json.dumps(worker(args.worker, args.iterations)))
+        return
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    import streamlit
+    result = {"commit": git_commit(), "backend": "postgres" if args.url else "sqlite", "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+              "streamlit": streamlit.__version__, "iterations": args.iterations, "sizes": {}}
+    for size in args.sizes:
+        rows = parse_size(size)
+        path, build_sec = ensure_db(args.data_dir, rows, args.users, args.rebuild, args.url)
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", path, "--iterations", str(args.iterations)],
+                              capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(proc.stderr[-2000:], file=sys.stderr); sys.exit(f"{size}: worker 失败")
+        res = json.loads(proc.stdout.strip().splitlines()[-1])
+        res.update(rows=rows, build_sec=build_sec)
+        result["sizes"][size] = res
+        print(f"== {size} 行 (峰值 RSS {res['peak_rss_mb']} MB)")
+        for flow in FLOWS:
+            f = res["flows"][flow]
+            print(f"  {flow:<14} p50 {f['wall_ms']['p50']:8.1f}ms  p90 {f['wall_ms']['p90']:8.1f}ms  p99 {f['wall_ms']['p99']:8.1f}ms"
+                  f"  cpu p50 {f['cpu_ms']['p50']:7.1f}ms  SQL {f['sql_per_rerun']:5.1f}/次 (SELECT {f['selects_per_rerun']})")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f: json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已写入 {args.out}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f: compare(json.load(f), result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# === 合成数据：按行数生成一个 life_os.db（或灌进一个 PostgreSQL 库），给各个 benchmark 共用 ===
+import os
+import random
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import db  # noqa: E402
+
+THEMES = ["核心能力", "创新实践", "终身探索", "身心健康", "社会连接", "审美修养"]
+STAGES = ["Input", "Process", "Output"]
+GOODS = [("🥤 快乐水", 60), ("🎮 游戏时光", 120), ("🎁 圣诞盲盒", 180), ("🛌 赖床券", 200)]
+FMT = "%Y-%m-%d %H:%M:%S"
+
+
+def build(path, rows, users=1000, days=3 * 365, schema=db.SCHEMA_VERSION, seed=0):
+    """生成 rows 条 task_log（expense_log 约 rows/10 条），所有时间落在最近 days 天内。
+    path 是 postgresql:// URL 时迁移到最新版并清空业务表后再灌数（schema 参数只对 SQLite 有效）。"""
+    rng = random.Random(seed)
+    now = datetime.now()
+    if db.is_postgres(path):
+        conn = db.connect(path)
+        db.migrate(conn)
+        conn.execute("TRUNCATE users, daily_log, task_log, expense_log, weekly_reports, user_summary, theme_summary, chat_messages, chat_summaries, purchase_requests, revoked_tokens RESTART IDENTITY")
+    else:
+        if os.path.exists(path): os.remove(path)
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA journal_mode=WAL"); conn.execute("PRAGMA synchronous=OFF")
+        db.migrate(conn, target=schema)
+
+    def tasks():
+        for _ in range(rows):
+            start = now - timedelta(seconds=rng.randrange(days * 86400))
+            dur = rng.randint(5, 120)
+            snap = [rng.randint(0, 10) for _ in range(5)]
+            yield (start.strftime(FMT), (start + timedelta(minutes=dur)).strftime(FMT), rng.choice(THEMES), "synthetic", dur, rng.choice(STAGES), *snap, f"user{rng.randrange(users)}")
+
+    def expenses():
+        for _ in range(rows // 10):
+            name, price = rng.choice(GOODS)
+            yield ((now - timedelta(seconds=rng.randrange(days * 86400))).strftime(FMT), name, price, f"user{rng.randrange(users)}")
+
+    conn.executemany("INSERT INTO task_log (start_time, end_time, theme, task_name, duration_min, ipo_stage, snap_emotion, snap_cognition, snap_awareness, snap_motivation, snap_social, user_id) VALUES (?,?,?,?,?,?,?,?,?,?,?,?)", tasks())
+    conn.executemany("INSERT INTO expense_log (date, item_name, cost, user_id) VALUES (?,?,?,?)", expenses())
+    conn.executemany("INSERT INTO weekly_reports (date, start_date, end_date, content, user_id) VALUES (?,?,?,?,?)", (((now - timedelta(days=7 * i)).strftime("%Y-%m-%d"), "", "", "synthetic report", f"user{u}") for u in range(users) for i in range(4)))
+    if schema >= 3: db.rebuild_summaries(conn)  # 汇总表在迁移时回填过一次，批量灌数后要重算
+    conn.commit()
+    return conn
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="生成合成 life_os.db")
+    ap.add_argument("path"); ap.add_argument("--rows", type=int, default=10_000); ap.add_argument("--users", type=int, default=1000)
+    a = ap.parse_args()
+    build(a.path, a.rows, a.users).close()
+    print(f"✅ {a.path}: {a.rows} task rows / {a.users} users")
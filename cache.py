@@ -0,0 +1,104 @@
+# === 按用户记忆的读缓存 ===
+# 读函数用 @memo_by_user 包一层，结果按 (user_id, 函数, 参数) 存在进程内：
+#   - TTL 到期自动失效（周报窗口这类随时间移动的查询不会一直旧下去）
+#   - 总内存超过上限时按 LRU 淘汰
+#   - 写路径调用 invalidate(user_id, 读函数...) 精确作废受影响的结果
+import functools
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+MAX_BYTES = int(float(os.environ.get("LIFEOS_CACHE_MB", "64")) * 1024 * 1024)
+TTL_SEC = float(os.environ.get("LIFEOS_CACHE_TTL", "300"))
+
+
+def _sizeof(value):
+    if hasattr(value, "memory_usage"):  # DataFrame：按实际列数据估算
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, (tuple, list)): return sys.getsizeof(value) + sum(_sizeof(v) for v in value)
+    if isinstance(value, dict): return sys.getsizeof(value) + sum(_sizeof(k) + _sizeof(v) for k, v in value.items())
+    return sys.getsizeof(value)
+
+
+class QueryCache:
+    def __init__(self, max_bytes=MAX_BYTES, ttl=TTL_SEC):
+        self.max_bytes, self.ttl = max_bytes, ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (user_id, 函数名, 参数) -> (结果, 过期时间, 字节数)，尾部是最近使用
+        self._by_user = {}             # user_id -> 该用户的 key 集合
+        self._gen = {}                 # user_id -> 写入代数；查询途中发生写入时丢弃这次结果
+        self._bytes = 0
+        self.counters = dict(hits=0, misses=0, evictions=0, expirations=0, invalidations=0)
+
+    def get(self, key):
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is not None and hit[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.counters["hits"] += 1
+                return True, hit[0], None
+            if hit is not None:
+                self._drop(key); self.counters["expirations"] += 1
+            self.counters["misses"] += 1
+            return False, None, self._gen.get(key[0], 0)
+
+    def put(self, key, value, gen):
+        size = _sizeof(value)
+        if size > self.max_bytes: return
+        with self._lock:
+            if self._gen.get(key[0], 0) != gen: return
+            if key in self._entries: self._drop(key)
+            self._entries[key] = (value, time.monotonic() + self.ttl, size)
+            self._by_user.setdefault(key[0], set()).add(key)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries))); self.counters["evictions"] += 1
+
+    def invalidate(self, user_id, names=None):
+        with self._lock:
+            self._gen[user_id] = self._gen.get(user_id, 0) + 1
+            for key in [k for k in self._by_user.get(user_id, ()) if names is None or k[1] in names]:
+                self._drop(key); self.counters["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear(); self._by_user.clear(); self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.counters["hits"] + self.counters["misses"]
+            return dict(self.counters, entries=len(self._entries), bytes=self._bytes, max_bytes=self.max_bytes, hit_rate=self.counters["hits"] / total if total else 0.0)
+
+    def _drop(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+        keys = self._by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys: del self._by_user[key[0]]
+
+
+default = QueryCache()
+
+
+def memo_by_user(fn):
+    @functools.wraps(fn)
+    def wrapper(user_id, *args):
+        key = (user_id, fn.__name__, args)
+        found, value, gen = default.get(key)
+        if found: return value
+        value = fn(user_id, *args)
+        default.put(key, value, gen)
+        return value
+    return wrapper
+
+
+def invalidate(user_id, *readers):
+    """作废 user_id 在这些读函数上的缓存；不传读函数则作废该用户全部缓存。"""
+    default.invalidate(user_id, {r.__name__ for r in readers} if readers else None)
+
+
+def stats():
+    return default.stats()
@@ -0,0 +1,98 @@
+# === AI 对话存储 ===
+# 每个用户的消息存在 chat_messages；发给模型的上下文是「滚动摘要 + 最近几轮」，
+# 最近几轮按 token 预算从新到旧截取，滑出窗口的旧消息攒够一批再交给模型压缩进摘要。
+import logging
+import os
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import ai_client
+import db
+
+CONTEXT_TOKENS = int(os.environ.get("LIFEOS_CHAT_TOKENS", "3000"))  # 摘要 + 窗口的总预算
+SUMMARY_BATCH = 1000    # 窗口外未摘要的消息超过这么多 token 才触发一次压缩
+SUMMARY_PROMPT = "把下面的对话压缩成不超过 300 字的中文摘要，保留用户的目标、偏好、提到的事实和没解决的问题。"
+SUMMARY_PREFIX = "以下是你和用户此前对话的摘要，回答时可以参考：\n"
+
+log = logging.getLogger(__name__)
+_compact_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="lifeos-chat")
+_compacting = set()     # 正在后台压缩的用户：同一用户同时只跑一个，避免两次摘要互相覆盖
+_compacting_lock = threading.Lock()
+
+
+def estimate_tokens(text):
+    # 粗估即可：中日韩字符约 1 token/字，其余约 4 字符/token
+    wide = sum(1 for ch in text if unicodedata.east_asian_width(ch) in "WF")
+    return wide + (len(text) - wide) // 4 + 1
+
+
+def append(user_id, role, content):
+    with db.connection() as conn:
+        conn.execute("INSERT INTO chat_messages (user_id, role, content, created_at) VALUES (?,?,?,?)", (user_id, role, content, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+
+
+def recent(user_id, limit):
+    """最近 limit 条消息（从旧到新）以及更早是否还有消息。"""
+    with db.connection() as conn:
+        rows = conn.execute("SELECT role, content FROM chat_messages WHERE user_id=? ORDER BY id DESC LIMIT ?", (user_id, limit + 1)).fetchall()
+    return rows[:limit][::-1], len(rows) > limit
+
+
+def _summary(conn, user_id):
+    return conn.execute("SELECT content, upto_id FROM chat_summaries WHERE user_id=?", (user_id,)).fetchone() or ("", 0)
+
+
+def _window(conn, user_id, summary, upto_id, budget):
+    """从最新往回取，直到超出预算；至少保留最新的一条。返回 [(id, role, content)]，从旧到新。"""
+    used, window = estimate_tokens(summary), []
+    for row in conn.execute("SELECT id, role, content FROM chat_messages WHERE user_id=? AND id>? ORDER BY id DESC", (user_id, upto_id)):
+        cost = estimate_tokens(row[2])
+        if window and used + cost > budget: break
+        window.append(row); used += cost
+    return window[::-1]
+
+
+def context(user_id, budget=CONTEXT_TOKENS):
+    with db.connection() as conn:
+        summary, upto_id = _summary(conn, user_id)
+        window = _window(conn, user_id, summary, upto_id, budget)
+    head = [{"role": "system", "content": SUMMARY_PREFIX + summary}] if summary else []
+    return head + [{"role": role, "content": content} for _, role, content in window]
+
+
+def compact(user_id, key, budget=CONTEXT_TOKENS):
+    """把滑出窗口的旧消息压缩进摘要；没 key、量不够或模型报错时什么都不做。"""
+    if not key: return False
+    with db.connection() as conn:
+        summary, upto_id = _summary(conn, user_id)
+        window = _window(conn, user_id, summary, upto_id, budget)
+        if not window: return False
+        stale = conn.execute("SELECT id, role, content FROM chat_messages WHERE user_id=? AND id>? AND id<? ORDER BY id LIMIT 200", (user_id, upto_id, window[0][0])).fetchall()
+    if sum(estimate_tokens(c) for _, _, c in stale) < SUMMARY_BATCH: return False
+    transcript = "\n".join(f"{role}: {content}" for _, role, content in stale)
+    try: new_summary = ai_client.chat([{"role": "system", "content": SUMMARY_PROMPT}, {"role": "user", "content": f"已有摘要：{summary or '（无）'}\n\n新的对话：\n{transcript}"}], key)
+    except ai_client.AIError as e:
+        log.warning("chat summary for %s failed: %s", user_id, e); return False
+    if not new_summary: return False
+    with db.connection() as conn:
+        conn.execute("INSERT INTO chat_summaries VALUES (?,?,?) ON CONFLICT(user_id) DO UPDATE SET content=excluded.content, upto_id=excluded.upto_id", (user_id, new_summary, stale[-1][0]))
+    return True
+
+
+def compact_async(user_id, key):
+    """在后台线程里压缩（摘要要等模型整段返回，最长到读超时），不阻塞回复之后的这次 rerun。返回是否提交了任务。"""
+    if not key: return False
+    with _compacting_lock:
+        if user_id in _compacting: return False
+        _compacting.add(user_id)
+
+    def run():
+        try: compact(user_id, key)
+        except Exception: log.exception("chat summary for %s failed", user_id)
+        finally:
+            with _compacting_lock: _compacting.discard(user_id)
+
+    _compact_pool.submit(run)
+    return True
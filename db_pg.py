@@ -0,0 +1,109 @@
+# === PostgreSQL 后端 ===
+# 设置 LIFEOS_DB_URL=postgresql://... 时启用，多个 Streamlit 副本共用一个库；默认仍是本地 SQLite。
+# 驱动用 psycopg 3 + psycopg_pool（pip install "psycopg[binary,pool]"），只有配置了 URL 才会导入。
+# PgConnection 把 psycopg 连接包成 sqlite3 的样子（? 占位符、conn.execute、with conn 提交 / 回滚），
+# 业务 SQL 两边共用一份，方言差异只在这里和 db.py 的迁移里处理。
+import re
+from contextlib import contextmanager
+from functools import lru_cache
+
+import psycopg
+from psycopg.pq import TransactionStatus
+from psycopg_pool import ConnectionPool
+
+import profiling
+
+IntegrityError = psycopg.IntegrityError
+RETRYABLE = (psycopg.errors.DeadlockDetected, psycopg.errors.SerializationFailure)
+MIGRATION_LOCK = 0x4C6966654F53   # pg_advisory_xact_lock 的键："LifeOS"
+
+_DDL = [(re.compile(r"\bINTEGER PRIMARY KEY AUTOINCREMENT\b"), "BIGSERIAL PRIMARY KEY"),
+        (re.compile(r"\bREAL\b"), "DOUBLE PRECISION")]   # SQLite 的 REAL 是 8 字节，PostgreSQL 的 REAL 只有 4 字节
+
+
+@lru_cache(maxsize=1024)
+def translate(sql):
+    """sqlite 风格 SQL → psycopg：字面 % 转义、? 换成 %s、建表语句换成对应类型。SQL 里的字符串字面量不能含 ?。"""
+    sql = sql.replace("%", "%%").replace("?", "%s")
+    if sql.lstrip().upper().startswith("CREATE TABLE"):
+        for pattern, repl in _DDL: sql = pattern.sub(repl, sql)
+    return sql
+
+
+class PgConnection:
+    dialect = "postgres"
+
+    def __init__(self, raw):
+        self.raw = raw
+        self._trace = None
+
+    def execute(self, sql, params=()):
+        if self._trace: self._trace(sql)
+        return self.raw.execute(translate(sql), tuple(params))
+
+    def executemany(self, sql, seq):
+        if self._trace: self._trace(sql)
+        cur = self.raw.cursor()
+        cur.executemany(translate(sql), seq)
+        return cur
+
+    def stream(self, sql, params=(), itersize=50_000):
+        """服务端游标：大结果集分批拉取，不把整张表一次性读进客户端内存。"""
+        if self._trace: self._trace(sql)
+        cur = self.raw.cursor(name="lifeos_stream")
+        cur.itersize = itersize
+        cur.execute(translate(sql), tuple(params))
+        return cur
+
+    def set_trace_callback(self, callback): self._trace = callback
+    def commit(self): self.raw.commit()
+    def rollback(self): self.raw.rollback()
+    def close(self): self.raw.close()
+
+    @property
+    def closed(self): return self.raw.closed
+
+    @property
+    def in_transaction(self):
+        return self.raw.info.transaction_status != TransactionStatus.IDLE
+
+    def __enter__(self): return self
+
+    def __exit__(self, exc_type, *_):
+        if exc_type is None: self.commit()
+        else: self.rollback()
+
+
+def connect(url):
+    # 非 autocommit：第一条语句隐式开启事务，和 Python sqlite3 一样由 commit / rollback 收尾
+    return profiling.trace(PgConnection(psycopg.connect(url, autocommit=False)))
+
+
+class PgPool:
+    """接口和 db.ConnectionPool 一致；底层是 psycopg_pool，借出块正常结束提交、异常回滚。"""
+
+    def __init__(self, url, size):
+        self._pool = ConnectionPool(url, min_size=1, max_size=size, kwargs={"autocommit": False}, open=True)
+
+    @contextmanager
+    def connection(self):
+        with self._pool.connection() as raw: yield profiling.trace(PgConnection(raw))
+
+    def close(self): self._pool.close()
+
+
+# --- 迁移相关的方言差异 ---
+def schema_version(conn):
+    if conn.execute("SELECT to_regclass('lifeos_schema')").fetchone()[0] is None: return 0
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM lifeos_schema").fetchone()[0]
+
+
+def set_schema_version(conn, version):
+    conn.execute("CREATE TABLE IF NOT EXISTS lifeos_schema (version INTEGER NOT NULL)")
+    conn.execute("DELETE FROM lifeos_schema")
+    conn.execute("INSERT INTO lifeos_schema VALUES (?)", (version,))
+
+
+def lock_migrations(conn):
+    """事务级 advisory lock：多个副本同时启动时迁移串行执行，提交 / 回滚后自动释放。"""
+    conn.execute("SELECT pg_advisory_xact_lock(?)", (MIGRATION_LOCK,))
@@ -0,0 +1,92 @@
+# === 写入队列 ===
+# 所有业务写操作（任务 / 消费 / 状态 / 周报）交给一个专职写线程：
+# 攒一批一起放进同一个 BEGIN IMMEDIATE 事务提交（group commit），每个操作套一层 SAVEPOINT，
+# 单个操作失败只回滚它自己。调用方默认等到提交完成才返回，所以紧接着的读一定能读到刚写的数据。
+# PostgreSQL 后端下每个副本各有一条写线程，副本之间靠行锁协调；死锁 / 序列化失败时只重试出错的那个操作。
+import queue
+import threading
+from concurrent.futures import Future
+
+import streamlit as st
+
+import db
+import profiling
+
+BATCH_MAX = 256       # 一次事务最多合并多少个操作
+LINGER_SEC = 0.002    # 队列刚空时再等一小会儿，让并发会话的写入凑进同一批
+OP_RETRIES = 3        # db.RETRYABLE 类错误的重试次数（SQLite 单写者，不会遇到）
+
+
+class WriteQueue:
+    def __init__(self, target=None):
+        self._target = target
+        self._conn = db.connect(target)  # SQLite 文件路径或 postgresql:// URL，默认取当前配置
+        self._q = queue.Queue()
+        self.batches = self.ops = 0
+        threading.Thread(target=self._loop, name="lifeos-writer", daemon=True).start()
+
+    def submit(self, op, *args):
+        """异步提交 op(conn, *args)，返回 Future；结果是 op 的返回值。"""
+        fut = Future()
+        self._q.put((fut, op, args))
+        return fut
+
+    def write(self, op, *args, timeout=30):
+        """同步写：等事务提交后返回（read-your-writes）。"""
+        return self.submit(op, *args).result(timeout)
+
+    def _take_batch(self):
+        batch = [self._q.get()]
+        while len(batch) < BATCH_MAX:
+            try: batch.append(self._q.get(timeout=LINGER_SEC) if len(batch) == 1 else self._q.get_nowait())
+            except queue.Empty: break
+        return batch
+
+    def _run(self, conn, op, args):
+        """在 SAVEPOINT 里执行一个操作，返回 (结果, 异常)。"""
+        for attempt in range(OP_RETRIES):
+            conn.execute("SAVEPOINT op")
+            try:
+                with profiling.span("write", op.__name__): result = op(conn, *args)
+                conn.execute("RELEASE op")
+                return result, None
+            except Exception as e:
+                conn.execute("ROLLBACK TO op"); conn.execute("RELEASE op")
+                if not isinstance(e, db.RETRYABLE) or attempt == OP_RETRIES - 1: return None, e
+
+    def _reset(self):
+        """回滚失败（连接已断）时丢掉这条连接，下一批重新连；写线程本身不能因此退出。"""
+        if self._conn is None: return
+        try:
+            if self._conn.in_transaction: self._conn.rollback()
+        except Exception:
+            try: self._conn.close()
+            except Exception: pass
+            self._conn = None
+
+    def _loop(self):
+        while True:
+            batch, done = self._take_batch(), []
+            try:
+                if self._conn is None or getattr(self._conn, "closed", False): self._conn = db.connect(self._target)  # 断开后重连
+                conn = self._conn
+                db.begin_write(conn)
+                for fut, op, args in batch: done.append((fut, *self._run(conn, op, args)))
+                with profiling.span("write", "commit"): conn.commit()
+            except Exception as e:  # 连接或提交失败：整批都没写进去
+                self._reset()
+                done = [(fut, None, e) for fut, _, _ in batch]
+            self.batches += 1; self.ops += len(batch)
+            for fut, result, error in done:
+                if error is None: fut.set_result(result)
+                else: fut.set_exception(error)
+
+
+@st.cache_resource
+def get_writer():
+    db.get_pool()  # 先确保迁移已跑完
+    return WriteQueue()
+
+
+def write(op, *args):
+    return get_writer().write(op, *args)
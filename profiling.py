@@ -0,0 +1,202 @@
+# === 可选的性能剖析 ===
+# LIFEOS_PROFILE=1 时才生效：给 DB 读写函数、每个标签页、每次 rerun、AI 调用计时，按 Prometheus 的固定分桶聚合成直方图；
+# 每条 SQLite 连接挂 trace 回调，按“当前在跑哪个函数”统计 SQL 条数。
+# 结果在驾驶舱的隐藏管理面板里看（LIFEOS_ADMINS 里的账号可见），或开 LIFEOS_METRICS_PORT 让 Prometheus 来抓。
+# 关闭时 timed() 原样返回函数、span() 返回同一个空上下文，热路径上没有额外开销。
+import contextlib
+import functools
+import os
+import threading
+import time
+
+ENABLED = os.environ.get("LIFEOS_PROFILE", "").lower() in ("1", "true", "yes")
+METRICS_PORT = int(os.environ.get("LIFEOS_METRICS_PORT", 0))
+METRICS_HOST = os.environ.get("LIFEOS_METRICS_HOST", "127.0.0.1")
+ADMINS = {u.strip() for u in os.environ.get("LIFEOS_ADMINS", "").split(",") if u.strip()}
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_NULL = contextlib.nullcontext()
+_lock = threading.Lock()
+_hists = {}          # (kind, name) -> Histogram
+_sql = {}            # (kind, name, verb) -> 条数
+_local = threading.local()
+_gauges = {}         # 前缀 -> (返回 {名字: 数值} 的函数, 其中按 counter 导出的名字)
+
+
+class Histogram:
+    __slots__ = ("counts", "total", "n")
+
+    def __init__(self):
+        self.counts, self.total, self.n = [0] * (len(BUCKETS) + 1), 0.0, 0
+
+    def observe(self, seconds):  # 调用方持锁
+        i = 0
+        while i < len(BUCKETS) and seconds > BUCKETS[i]: i += 1
+        self.counts[i] += 1; self.total += seconds; self.n += 1
+
+    def quantile(self, q):
+        """和 PromQL histogram_quantile 一样在桶内线性插值。"""
+        if not self.n: return 0.0
+        rank, seen = q * self.n, 0
+        for i, c in enumerate(self.counts):
+            if seen + c >= rank and c:
+                lo = BUCKETS[i - 1] if i else 0.0
+                hi = BUCKETS[i] if i < len(BUCKETS) else BUCKETS[-1]
+                return lo + (hi - lo) * (rank - seen) / c
+            seen += c
+        return BUCKETS[-1]
+
+
+def observe(kind, name, seconds):
+    if not ENABLED: return
+    with _lock:
+        h = _hists.get((kind, name))
+        if h is None: h = _hists[(kind, name)] = Histogram()
+        h.observe(seconds)
+
+
+@contextlib.contextmanager
+def _span(kind, name):
+    prev = getattr(_local, "current", None)
+    _local.current = (kind, name)
+    t0 = time.perf_counter()
+    try: yield
+    finally:
+        observe(kind, name, time.perf_counter() - t0)
+        _local.current = prev
+
+
+def span(kind, name):
+    """with span("tab", "商店"): ...  期间执行的 SQL 也记在 (kind, name) 名下。"""
+    return _span(kind, name) if ENABLED else _NULL
+
+
+def timed(kind, name=None):
+    """装饰器；关闭剖析时直接返回原函数。"""
+    def deco(fn):
+        if not ENABLED: return fn
+        label = name or fn.__name__
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _span(kind, label): return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+def timed_stream(kind, name=None):
+    """给生成器函数计时：总耗时记 kind，首段输出的等待时间记 kind_first_chunk（流式 AI 的体感延迟）。"""
+    def deco(fn):
+        if not ENABLED: return fn
+        label = name or fn.__name__
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0, first = time.perf_counter(), True
+            try:
+                for chunk in fn(*args, **kwargs):
+                    if first: observe(f"{kind}_first_chunk", label, time.perf_counter() - t0); first = False
+                    yield chunk
+            finally: observe(kind, label, time.perf_counter() - t0)
+        return wrapper
+    return deco
+
+
+def _count_sql(statement):
+    kind, name = getattr(_local, "current", None) or ("-", "-")
+    verb = statement.lstrip()[:6].upper().rstrip()
+    key = (kind, name, verb if verb in ("SELECT", "INSERT", "UPDATE", "DELETE") else "OTHER")
+    with _lock: _sql[key] = _sql.get(key, 0) + 1
+
+
+def trace(conn):
+    """给新建的连接挂 SQL 计数回调（db.open_connection 里调用）。"""
+    if ENABLED: conn.set_trace_callback(_count_sql)
+    return conn
+
+
+# --- 导出 ---
+def snapshot():
+    """管理面板用：[{kind, name, count, mean_ms, p50_ms, p95_ms, p99_ms, sql}]，按总耗时降序。"""
+    with _lock:
+        sql = {}
+        for (kind, name, _), n in _sql.items(): sql[(kind, name)] = sql.get((kind, name), 0) + n
+        rows = [{"kind": kind, "name": name, "count": h.n, "total_s": round(h.total, 3), "mean_ms": round(h.total / h.n * 1000, 2),
+                 "p50_ms": round(h.quantile(0.5) * 1000, 2), "p95_ms": round(h.quantile(0.95) * 1000, 2), "p99_ms": round(h.quantile(0.99) * 1000, 2),
+                 "sql": sql.get((kind, name), 0)} for (kind, name), h in _hists.items() if h.n]
+    return sorted(rows, key=lambda r: -r["total_s"])
+
+
+def register_gauges(prefix, fn, counters=()):
+    """登记一组进程级指标（如读缓存的命中数 / 条目数）：导出 /metrics 时调用 fn() 取当前值。
+    和计时不同，不受 LIFEOS_PROFILE 开关影响，取值只发生在导出时。"""
+    with _lock: _gauges[prefix] = (fn, frozenset(counters))
+
+
+def gauges():
+    """{前缀: fn() 的结果}，给管理面板展示。"""
+    with _lock: items = list(_gauges.items())
+    return {prefix: fn() for prefix, (fn, _) in items}
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text():
+    lines = []
+    with _lock:
+        for kind in sorted({k for k, _ in _hists}):
+            metric = f"lifeos_{kind}_seconds"
+            lines += [f"# HELP {metric} LifeOS {kind} latency", f"# TYPE {metric} histogram"]
+            for (k, name), h in sorted(_hists.items()):
+                if k != kind: continue
+                cum = 0
+                for bound, c in zip((*BUCKETS, "+Inf"), h.counts):
+                    cum += c
+                    lines.append(f'{metric}_bucket{{name="{_label(name)}",le="{bound}"}} {cum}')
+                lines.append(f'{metric}_sum{{name="{_label(name)}"}} {h.total:.6f}')
+                lines.append(f'{metric}_count{{name="{_label(name)}"}} {h.n}')
+        if _sql:
+            lines += ["# HELP lifeos_sql_statements_total SQL statements by caller", "# TYPE lifeos_sql_statements_total counter"]
+            for (kind, name, verb), n in sorted(_sql.items()):
+                lines.append(f'lifeos_sql_statements_total{{kind="{_label(kind)}",name="{_label(name)}",verb="{verb}"}} {n}')
+        registered = list(_gauges.items())
+    for prefix, (fn, counters) in sorted(registered):  # 锁外取值：fn 可能要拿它自己的锁
+        for key, value in sorted(fn().items()):
+            metric, typ = (f"lifeos_{prefix}_{key}_total", "counter") if key in counters else (f"lifeos_{prefix}_{key}", "gauge")
+            lines += [f"# TYPE {metric} {typ}", f"{metric} {value}"]
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    with _lock: _hists.clear(); _sql.clear()
+
+
+_server = None
+
+
+def serve(port=None, host=None):
+    """后台线程起 /metrics；每个进程只起一次，端口为 0 或剖析关闭时什么都不做。返回 server 或 None。"""
+    global _server
+    port = METRICS_PORT if port is None else port
+    if not ENABLED or not port: return None
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # 只有开了导出才付 http.server 的导入代价
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404); return
+            body = prometheus_text().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args): pass
+
+    with _lock:
+        if _server is None:
+            try: _server = ThreadingHTTPServer((host or METRICS_HOST, port), MetricsHandler)
+            except OSError: return None  # 端口被同机的另一个进程占了：这个进程就不导出
+            threading.Thread(target=_server.serve_forever, name="lifeos-metrics", daemon=True).start()
+    return _server
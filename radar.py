@@ -0,0 +1,35 @@
+# === 五维雷达图：直接拼 SVG，按分数元组记忆 ===
+# 分数只有 11^5 种组合，同一组分数重复渲染直接命中 lru_cache；
+# 文字交给浏览器排版，中文标签不再依赖服务器上的字体文件，也不用加载 Matplotlib。
+import math
+from functools import lru_cache
+
+LABELS = ["情绪", "认知", "觉察", "动机", "人际"]
+SIZE, RADIUS, MAX_SCORE = 320, 110, 10
+
+
+def _point(i, r):
+    # 和原来的极坐标图一致：第一个维度在正右方，逆时针排列
+    theta = 2 * math.pi * i / len(LABELS)
+    return SIZE / 2 + r * math.cos(theta), SIZE / 2 - r * math.sin(theta)
+
+
+@lru_cache(maxsize=4096)
+def radar_svg(scores):
+    """scores: 五个 0-10 的整数组成的 tuple，返回一段可直接 st.markdown 的 SVG。"""
+    color = '#2e8b57' if sum(scores) / len(scores) >= 6 else '#d63031'
+    c = SIZE / 2
+    parts = [f'<svg viewBox="0 0 {SIZE} {SIZE}" width="100%" style="max-width:{SIZE}px; display:block; margin:auto;" xmlns="http://www.w3.org/2000/svg">',
+             f'<circle cx="{c}" cy="{c}" r="{RADIUS}" fill="#f8f9fa"/>']
+    for ring in range(2, MAX_SCORE + 1, 2):
+        parts.append(f'<circle cx="{c}" cy="{c}" r="{RADIUS * ring / MAX_SCORE:.1f}" fill="none" stroke="#dcdde1" stroke-width="1"/>')
+    for i, label in enumerate(LABELS):
+        x, y = _point(i, RADIUS)
+        parts.append(f'<line x1="{c}" y1="{c}" x2="{x:.1f}" y2="{y:.1f}" stroke="#dcdde1" stroke-width="1"/>')
+        lx, ly = _point(i, RADIUS + 22)
+        anchor = "start" if lx > c + 5 else "end" if lx < c - 5 else "middle"
+        parts.append(f'<text x="{lx:.1f}" y="{ly:.1f}" text-anchor="{anchor}" dominant-baseline="middle" font-size="13" font-weight="bold" fill="#2d3436">{label}</text>')
+    pts = " ".join(f"{x:.1f},{y:.1f}" for x, y in (_point(i, RADIUS * s / MAX_SCORE) for i, s in enumerate(scores)))
+    parts.append(f'<polygon points="{pts}" fill="{color}" fill-opacity="0.3" stroke="{color}" stroke-width="2" stroke-linejoin="round"/>')
+    parts.append('</svg>')
+    return "".join(parts)